@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark the time per epoch and the peak memory of Neuron,
+NeuralNetwork and DeepNeuralNetwork in float64 and float32, on random
+data the size of the MNIST training set
+"""
+import numpy as np
+import time
+import tracemalloc
+Neuron = __import__('7-neuron').Neuron
+NeuralNetwork = __import__('15-neural_network').NeuralNetwork
+DeepNeuralNetwork = __import__('28-deep_neural_network').DeepNeuralNetwork
+
+
+def epoch(model, X, Y, **kwargs):
+    """
+    Returns the time of an epoch of training of model in seconds and the
+    peak memory allocated by NumPy during it in MB
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    model.train(X, Y, iterations=1, verbose=False, graph=False, **kwargs)
+    seconds = (time.perf_counter() - start) / 2
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return seconds, peak
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    m = 50000
+    labels = np.random.randint(0, 10, m)
+    Y_binary = (labels == 0).reshape(1, m).astype(int)
+    Y_one_hot = np.eye(10)[labels].T
+
+    print('{:<18} {:>8} {:>10} {:>10}'.format(
+        'model', 'dtype', 's/epoch', 'peak MB'))
+    for dtype in [np.float64, np.float32]:
+        X = np.random.rand(784, m).astype(dtype)
+        runs = [('Neuron', Neuron(784, dtype=dtype), Y_binary, {}),
+                ('NeuralNetwork', NeuralNetwork(784, 64, dtype=dtype),
+                 Y_binary, {}),
+                ('DeepNeuralNetwork',
+                 DeepNeuralNetwork(784, [128, 64, 10], dtype=dtype),
+                 Y_one_hot, {'batch_size': 128})]
+        for name, model, Y, kwargs in runs:
+            seconds, peak = epoch(model, X, Y, **kwargs)
+            print('{:<18} {:>8} {:>10.3f} {:>10.1f}'.format(
+                name, np.dtype(dtype).name, seconds, peak))
@@ -2,12 +2,14 @@
 """Neural network that performs binary classification"""
 import numpy as np
 import matplotlib.pyplot as plt
+kernels = __import__('kernels')
 
 
 class NeuralNetwork:
     """Performs binary classification with one hidden layer"""
-    def __init__(self, nx, nodes):
-        """Constructor"""
+    def __init__(self, nx, nodes, dtype=np.float64):
+        """Constructor, dtype being the floating point type of the
+        weights and computations"""
         if not isinstance(nx, int):
             raise TypeError("nx must be an integer")
         if nx < 1:
@@ -16,10 +18,13 @@ class NeuralNetwork:
             raise TypeError("nodes must be an integer")
         if nodes < 1:
             raise ValueError("nodes must be a positive integer")
-        self.__W1 = np.random.randn(nodes, nx)
-        self.__b1 = np.zeros((nodes, 1))
+        if not np.issubdtype(dtype, np.floating):
+            raise TypeError("dtype must be a floating point type")
+        self.__dtype = np.dtype(dtype)
+        self.__W1 = np.random.randn(nodes, nx).astype(self.__dtype)
+        self.__b1 = np.zeros((nodes, 1), dtype=self.__dtype)
         self.__A1 = 0
-        self.__W2 = np.random.randn(1, nodes)
+        self.__W2 = np.random.randn(1, nodes).astype(self.__dtype)
         self.__b2 = 0
         self.__A2 = 0
 
@@ -47,35 +52,41 @@ class NeuralNetwork:
     def A2(self):
         return self.__A2
 
+    @property
+    def dtype(self):
+        return self.__dtype
+
     def forward_prop(self, X):
         """Calculates the forward propagation of the neural network"""
+        X = X.astype(self.__dtype, copy=False)
         Z1 = np.matmul(self.__W1, X) + self.__b1
-        self.__A1 = 1 / (1 + np.exp(-Z1))
+        self.__A1 = kernels.sigmoid(Z1, out=Z1)
         Z2 = np.matmul(self.__W2, self.__A1) + self.__b2
-        self.__A2 = 1 / (1 + np.exp(-Z2))
+        self.__A2 = kernels.sigmoid(Z2, out=Z2)
         return self.__A1, self.__A2
 
     def cost(self, Y, A):
         """Calculates the cost of the model using logistic regression"""
-        m = len(A[0])
-        cost = -1/m * np.sum(np.multiply(np.log(A), Y) + np.multiply(
-            np.log(1.0000001-A), (1-Y)))
-        return cost
+        return kernels.binary_cross_entropy(Y, A)
 
     def evaluate(self, X, Y):
         """Evaluates the neural network’s predictions"""
-        A1, A2 = self.forward_prop(X)
-        cost = self.cost(Y, A2)
-        Y_hat = A2.round().astype(int)
+        X = X.astype(self.__dtype, copy=False)
+        Z1 = np.matmul(self.__W1, X) + self.__b1
+        self.__A1 = kernels.sigmoid(Z1, out=Z1)
+        Z2 = np.matmul(self.__W2, self.__A1) + self.__b2
+        self.__A2, cost = kernels.sigmoid_cross_entropy(Z2, Y, out=Z2)
+        Y_hat = self.__A2.round().astype(int)
         return Y_hat, cost
 
     def gradient_descent(self, X, Y, A1, A2, alpha=0.05):
         """Calculates one pass of gradient descent on the neural network"""
         m = len(Y[0])
-        dZ2 = A2 - Y
+        X = X.astype(self.__dtype, copy=False)
+        dZ2 = A2 - Y.astype(self.__dtype, copy=False)
         dW2 = np.matmul(dZ2, A1.T) / m
         db2 = np.sum(dZ2, axis=1, keepdims=True) / m
-        dZ1 = np.matmul(self.__W2.T, dZ2) * (A1 * (1 - A1))
+        dZ1 = kernels.sigmoid_backward(A1, np.matmul(self.__W2.T, dZ2))
         dW1 = np.matmul(dZ1, X.T) / m
         db1 = np.sum(dZ1, axis=1, keepdims=True) / m
         self.__W2 = self.__W2 - alpha * dW2
@@ -99,6 +110,8 @@ class NeuralNetwork:
                 raise TypeError("step must be an integer")
             if step <= 0 or step > iterations:
                 raise ValueError("step must be positive and <= iterations")
+        X = X.astype(self.__dtype, copy=False)
+        Y = Y.astype(self.__dtype, copy=False)
         iteration_list = []
         cost_list = []
         for i in range(iterations + 1):
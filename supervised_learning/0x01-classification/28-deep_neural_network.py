@@ -1,15 +1,36 @@
 #!/usr/bin/env python3
 """defines a deep neural network performing binary classification"""
+import json
 import numpy as np
 import matplotlib.pyplot as plt
+import os
 import pickle
+from types import MappingProxyType
+kernels = __import__('kernels')
+
+FORMAT_VERSION = 1
+
+
+def read_only(array):
+    """Returns a read-only view of array"""
+    view = array.view()
+    view.flags.writeable = False
+    return view
 
 
 class DeepNeuralNetwork:
-    """deep neural network performing binary classification"""
+    """deep neural network performing binary classification
+
+    All the weights and biases live in one flat buffer, and the
+    gradients in another with the same layout, allocated by the first
+    gradient descent, with a view per layer.
+    The activations and the gradients of the cost with respect to them
+    are kept in buffers that only grow with the number of examples.
+    """
 
-    def __init__(self, nx, layers, activation='sig'):
-        """Constructor"""
+    def __init__(self, nx, layers, activation='sig', dtype=np.float64):
+        """Constructor, dtype being the floating point type of the
+        parameters, activations and gradients"""
         if not isinstance(nx, int):
             raise TypeError("nx must be an integer")
         if nx < 1:
@@ -18,25 +39,97 @@ class DeepNeuralNetwork:
             raise TypeError("layers must be a list of positive integers")
         if activation != 'sig' and activation != 'tanh':
             raise ValueError("activation must be 'sig' or 'tanh'")
+        if not np.issubdtype(dtype, np.floating):
+            raise TypeError("dtype must be a floating point type")
+        for nodes in layers:
+            if not isinstance(nodes, int) or nodes < 1:
+                raise TypeError("layers must be a list of positive integers")
 
         self.__L = len(layers)
-        self.__cache = {}
-        self.__weights = {}
         self.__activation = activation
+        self.__sizes = [nx] + layers
+        self.__params = np.zeros(self.__size(), dtype=dtype)
+        self.__views()
 
         for i in range(self.L):
-            W_key = "W" + str(i + 1)
-            b_key = "b" + str(i + 1)
-            if not isinstance(layers[i], int) or layers[i] < 1:
-                raise TypeError("layers must be a list of positive integers")
+            self.__W[i][...] = np.random.randn(
+                layers[i], self.__sizes[i]) * np.sqrt(2/self.__sizes[i])
 
-            if i == 0:
-                self.weights[W_key] = np.random.randn(
-                    layers[i], nx) * np.sqrt(2/nx)
-            else:
-                self.weights[W_key] = np.random.randn(
-                    layers[i], layers[i - 1]) * np.sqrt(2/layers[i - 1])
-            self.weights[b_key] = np.zeros((layers[i], 1))
+    def __size(self):
+        """Returns the number of weights and biases"""
+        return sum((n_prev + 1) * n for n_prev, n in
+                   zip(self.__sizes[:-1], self.__sizes[1:]))
+
+    def __layer_views(self, buffer):
+        """Returns the lists of the per-layer weight and bias views of a
+        buffer with the layout of the parameters"""
+        W, b = [], []
+        offset = 0
+        for n_prev, n in zip(self.__sizes[:-1], self.__sizes[1:]):
+            W.append(buffer[offset:offset + n * n_prev].reshape(n, n_prev))
+            offset += n * n_prev
+            b.append(buffer[offset:offset + n].reshape(n, 1))
+            offset += n
+        return W, b
+
+    def __views(self):
+        """Creates the per-layer views of the parameter buffer and
+        empties the gradient and activation buffers"""
+        self.__W, self.__b = self.__layer_views(self.__params)
+        self.__grads = None
+        weights = {}
+        for i in range(self.__L):
+            weights["W" + str(i + 1)] = read_only(self.__W[i])
+            weights["b" + str(i + 1)] = read_only(self.__b[i])
+        self.__weights = MappingProxyType(weights)
+        self.__capacity = 0
+        self.__m = None
+
+    def __buffers(self, m):
+        """Returns the activation buffers A, dZ and dA for m examples,
+        growing them if needed"""
+        if m > self.__capacity:
+            self.__capacity = m
+            nodes = sum(self.__sizes[1:])
+            self.__A_buffer = np.empty(nodes * m, dtype=self.dtype)
+            self.__dZ_buffer = np.empty(nodes * m, dtype=self.dtype)
+            self.__dA_buffer = np.empty(nodes * m, dtype=self.dtype)
+            self.__m = None
+        if m != self.__m:
+            self.__m = m
+            self.__A, self.__dZ, self.__dA = [None], [None], [None]
+            offset = 0
+            for n in self.__sizes[1:]:
+                for views, buffer in ((self.__A, self.__A_buffer),
+                                      (self.__dZ, self.__dZ_buffer),
+                                      (self.__dA, self.__dA_buffer)):
+                    views.append(buffer[offset:offset + n * m].reshape(n, m))
+                offset += n * self.__capacity
+
+    def __getstate__(self):
+        """Pickles the layer sizes and parameters only"""
+        return {'L': self.__L, 'activation': self.__activation,
+                'sizes': self.__sizes, 'params': self.__params}
+
+    def __setstate__(self, state):
+        """Unpickles the parameters, also from the dict based format"""
+        if 'params' not in state:
+            prefix = '_DeepNeuralNetwork__'
+            weights = state[prefix + 'weights']
+            L = state[prefix + 'L']
+            state = {'L': L, 'activation': state.get(
+                         prefix + 'activation', 'sig'),
+                     'sizes': [weights['W1'].shape[1]] + [
+                         weights["W" + str(i + 1)].shape[0]
+                         for i in range(L)],
+                     'params': np.concatenate([
+                         weights[key + str(i + 1)].ravel()
+                         for i in range(L) for key in 'Wb'])}
+        self.__L = state['L']
+        self.__activation = state['activation']
+        self.__sizes = state['sizes']
+        self.__params = state['params']
+        self.__views()
 
     @property
     def L(self):
@@ -44,6 +137,8 @@ class DeepNeuralNetwork:
 
     @property
     def cache(self):
+        if self.__m is None:
+            return {}
         return self.__cache
 
     @property
@@ -54,64 +149,107 @@ class DeepNeuralNetwork:
     def activation(self):
         return self.__activation
 
-    def forward_prop(self, X):
-        """Calculates the forward propagation of the deep neural network"""
+    @property
+    def dtype(self):
+        return self.__params.dtype
+
+    def forward_prop(self, X, Y=None):
+        """Calculates the forward propagation of the deep neural network
+
+        With the labels Y, the cost of the output is computed along with
+        its softmax and also returned
+
+        The output A is a copy, but cache is a new dict of read-only
+        views of the activation buffers, which the next forward_prop
+        overwrites: copy its arrays to keep them
+        """
+        self.__buffers(X.shape[1])
+        X = X.astype(self.dtype, copy=False)
+        self.__A[0] = X
+        self.__cache = {"A" + str(i): read_only(self.__A[i])
+                        for i in range(1, self.__L + 1)}
         self.__cache['A0'] = X
         for i in range(self.__L):
-            A_prev = "A" + str(i)
-            W_key = "W" + str(i + 1)
-            b_key = "b" + str(i + 1)
-            A_current = "A" + str(i + 1)
-            Z = np.matmul(self.__weights[W_key],
-                          self.__cache[A_prev]) + self.__weights[b_key]
+            A = self.__A[i + 1]
+            np.matmul(self.__W[i], self.__A[i], out=A)
+            A += self.__b[i]
             if i == self.__L - 1:
-                t = np.exp(Z)
-                self.__cache[A_current] = t / np.sum(t, axis=0, keepdims=True)
-            else:
-                if self.__activation == 'sig':
-                    self.__cache[A_current] = 1 / (1 + np.exp(-Z))
-                elif self.__activation == 'tanh':
-                    self.__cache[A_current] = np.tanh(Z)
-        return self.__cache[A_current], self.__cache
+                if Y is not None:
+                    _, cost = kernels.softmax_cross_entropy(A, Y, out=A)
+                else:
+                    kernels.softmax(A, out=A)
+            elif self.__activation == 'sig':
+                kernels.sigmoid(A, out=A)
+            elif self.__activation == 'tanh':
+                kernels.tanh(A, out=A)
+        A = self.__A[self.__L].copy()
+        if Y is not None:
+            return A, self.__cache, cost
+        return A, self.__cache
 
     def cost(self, Y, A):
         """Calculates the cost of the model using logistic regression"""
-        m = len(A[0])
-        cost = -1/m * np.sum(Y * np.log(A))
-        return cost
+        return kernels.cross_entropy(Y, A)
 
     def evaluate(self, X, Y):
         """Evaluates the neural network predictions"""
-        A, cache = self.forward_prop(X)
+        A, cache, cost = self.forward_prop(X, Y)
         A_max = np.amax(A, axis=0)
-        cost = self.cost(Y, A)
         Y_hat = np.where(A == A_max, 1, 0)
         return Y_hat, cost
 
     def gradient_descent(self, Y, cache, alpha=0.05):
-        """Calculates one pass of gradient descent on the neural network"""
+        """Calculates one pass of gradient descent on the neural network
+
+        With the cache returned by the last forward_prop, the
+        activations are read from the buffers it is a view of. Any other
+        cache must hold its own arrays, e.g. copies: the views of an
+        earlier forward_prop were overwritten and raise a ValueError.
+        All the parameters are updated in place at once.
+        """
         m = len(Y[0])
+        if cache is self.cache:
+            A, dZ, dA = self.__A, self.__dZ, self.__dA
+        else:
+            A = [cache["A" + str(i)] for i in range(self.__L + 1)]
+            if self.__m is not None and any(
+                    np.may_share_memory(a, self.__A_buffer) for a in A[1:]):
+                raise ValueError("cache is from an earlier forward_prop, "
+                                 "whose activations were overwritten")
+            A = [np.asarray(a, dtype=self.dtype) for a in A]
+            dZ = [None] + [np.empty_like(a) for a in A[1:]]
+            dA = [None] + [np.empty_like(a) for a in A[1:]]
+        if self.__grads is None:
+            self.__grads = np.zeros(self.__params.shape, self.__params.dtype)
+            self.__dW, self.__db = self.__layer_views(self.__grads)
         for i in reversed(range(self.__L)):
-            A_current = "A" + str(i + 1)
-            A_prev = "A" + str(i)
-            W_current = "W" + str(i + 1)
-            b_current = "b" + str(i + 1)
             if i == self.__L - 1:
-                dZ = cache[A_current] - Y
+                np.subtract(A[i + 1], Y, out=dZ[i + 1])
             else:
                 if self.__activation == 'sig':
-                    dZ = dA * ((cache[A_current]) * (1 - cache[A_current]))
+                    kernels.sigmoid_backward(A[i + 1], dA[i + 1],
+                                             out=dZ[i + 1])
                 elif self.__activation == 'tanh':
-                    dZ = dA * (1 - (cache[A_current] ** 2))
-            dW = np.matmul(dZ, cache[A_prev].T) / m
-            db = np.sum(dZ, axis=1, keepdims=True) / m
-            dA = np.matmul(self.__weights[W_current].T, dZ)
-            self.__weights[W_current] = self.__weights[W_current] - alpha * dW
-            self.__weights[b_current] = self.__weights[b_current] - alpha * db
+                    kernels.tanh_backward(A[i + 1], dA[i + 1],
+                                          out=dZ[i + 1])
+            np.matmul(dZ[i + 1], A[i].T, out=self.__dW[i])
+            np.sum(dZ[i + 1], axis=1, keepdims=True, out=self.__db[i])
+            if i > 0:
+                np.matmul(self.__W[i].T, dZ[i + 1], out=dA[i])
+        self.__grads *= alpha / m
+        self.__params -= self.__grads
 
     def train(self, X, Y, iterations=5000, alpha=0.05,
-              verbose=True, graph=True, step=100):
-        """Trains the neural network"""
+              verbose=True, graph=True, step=100, batch_size=None,
+              shuffle=True):
+        """Trains the neural network
+
+        The cost is only computed on the iterations it is printed or
+        plotted. With batch_size, every iteration is an epoch of gradient
+        descent on minibatches of batch_size examples, in a new random
+        order if shuffle is True, and the evaluation of X after the last
+        epoch is returned.
+        """
         if not isinstance(iterations, int):
             raise TypeError("iterations must be an integer")
         if iterations <= 0:
@@ -125,11 +263,34 @@ class DeepNeuralNetwork:
                 raise TypeError("step must be an integer")
             if step <= 0 or step > iterations:
                 raise ValueError("step must be positive and <= iterations")
+        if batch_size is not None:
+            if not isinstance(batch_size, int):
+                raise TypeError("batch_size must be an integer")
+            if batch_size <= 0:
+                raise ValueError("batch_size must be a positive integer")
+        m = X.shape[1]
+        X = X.astype(self.dtype, copy=False)
         iteration_list = []
         cost_list = []
         for i in range(iterations + 1):
-            Y_hat, cost = self.evaluate(X, Y)
-            self.gradient_descent(Y, self.__cache, alpha)
+            log = i % step == 0 or i == iterations
+            if batch_size is None:
+                if log:
+                    A, cache, cost = self.forward_prop(X, Y)
+                else:
+                    A, cache = self.forward_prop(X)
+                self.gradient_descent(Y, cache, alpha)
+            else:
+                if log:
+                    _, cost = self.evaluate(X, Y)
+                order = np.random.permutation(m) if shuffle else None
+                for start in range(0, m, batch_size):
+                    if order is None:
+                        batch = slice(start, start + batch_size)
+                    else:
+                        batch = order[start:start + batch_size]
+                    A, cache = self.forward_prop(X[:, batch])
+                    self.gradient_descent(Y[:, batch], cache, alpha)
             if i % step == 0:
                 if verbose is True:
                     print("Cost after {} iterations: {}".format(i, cost))
@@ -142,20 +303,75 @@ class DeepNeuralNetwork:
             plt.ylabel('cost')
             plt.title('Training Cost')
             plt.show()
+        if batch_size is not None:
+            return self.evaluate(X, Y)
+        Y_hat = np.where(A == np.amax(A, axis=0), 1, 0)
         return Y_hat, cost
 
     def save(self, filename):
-        """Saves the instance object to a file in pickle format"""
-        if not filename.endswith(".pkl"):
-            filename += ".pkl"
-        with open(filename, 'wb') as f:
-            pickle.dump(self, f)
+        """Saves the weights of the model
+
+        filename.json holds a header with the format version, the layer
+        sizes, activation and dtype, and filename.npy the flat parameter
+        buffer. A filename ending in .pkl is pickled instead.
+        """
+        if filename.endswith(".pkl"):
+            with open(filename, 'wb') as f:
+                pickle.dump(self, f)
+            return
+        if filename.endswith(".json"):
+            filename = filename[:-len(".json")]
+        np.save(filename + ".npy", self.__params)
+        header = {'format': 'DeepNeuralNetwork',
+                  'version': FORMAT_VERSION,
+                  'nx': self.__sizes[0],
+                  'layers': self.__sizes[1:],
+                  'activation': self.__activation,
+                  'dtype': self.dtype.name,
+                  'params': os.path.basename(filename) + ".npy"}
+        with open(filename + ".json", 'w') as f:
+            json.dump(header, f)
 
     @staticmethod
-    def load(filename):
-        """Loads a pickled DeepNeuralNetwork object"""
+    def load(filename, mmap_mode=None):
+        """Loads a model saved by save, or None if there is no such file
+
+        A .pkl file, also one pickled by the previous versions, is
+        unpickled: saving the result migrates it to the weights only
+        format. mmap_mode is passed to np.load, so that with 'r' the
+        parameters are read-only pages shared between the processes
+        scoring with the same file, and the model cannot be trained.
+        """
         try:
-            with open(filename, 'rb') as f:
-                return pickle.load(f)
+            if filename.endswith(".pkl"):
+                with open(filename, 'rb') as f:
+                    return pickle.load(f)
+            if not filename.endswith(".json"):
+                filename += ".json"
+            with open(filename) as f:
+                header = json.load(f)
+            if header.get('format') != 'DeepNeuralNetwork':
+                raise ValueError("not a DeepNeuralNetwork file")
+            if header['version'] > FORMAT_VERSION:
+                raise ValueError("unsupported format version {}".format(
+                    header['version']))
+            params = np.load(os.path.join(os.path.dirname(filename),
+                                          header['params']),
+                             mmap_mode=mmap_mode)
         except FileNotFoundError:
             return None
+        sizes = [header['nx']] + header['layers']
+        size = sum((n_prev + 1) * n for n_prev, n in
+                   zip(sizes[:-1], sizes[1:]))
+        if (params.dtype != np.dtype(header['dtype']) or
+                params.shape != (size,)):
+            raise ValueError("parameters do not match the header: "
+                             "expected {} {} values, got {} {}".format(
+                                 size, header['dtype'], params.shape,
+                                 params.dtype))
+        model = DeepNeuralNetwork.__new__(DeepNeuralNetwork)
+        model.__setstate__({'L': len(header['layers']),
+                            'activation': header['activation'],
+                            'sizes': sizes,
+                            'params': params})
+        return model
@@ -2,18 +2,23 @@
 """Neuron that performs binary classification"""
 import numpy as np
 import matplotlib.pyplot as plt
+kernels = __import__('kernels')
 
 
 class Neuron:
     """defines a single neuron performing binary classification"""
 
-    def __init__(self, nx):
-        "Neuron constructor"
+    def __init__(self, nx, dtype=np.float64):
+        """Neuron constructor, dtype being the floating point type of its
+        weights and computations"""
         if not isinstance(nx, int):
             raise TypeError("nx must be a integer")
         if nx < 1:
             raise ValueError("nx must be positive")
-        self.__W = np.random.randn(1, nx)
+        if not np.issubdtype(dtype, np.floating):
+            raise TypeError("dtype must be a floating point type")
+        self.__dtype = np.dtype(dtype)
+        self.__W = np.random.randn(1, nx).astype(self.__dtype)
         self.__b = 0
         self.__A = 0
 
@@ -29,30 +34,34 @@ class Neuron:
     def A(self):
         return self.__A
 
+    @property
+    def dtype(self):
+        return self.__dtype
+
     def forward_prop(self, X):
         """Calculates the forward propagation of the neuron"""
+        X = X.astype(self.__dtype, copy=False)
         Z = np.matmul(self.__W, X) + self.__b
-        self.__A = 1/(1+np.exp(-Z))
+        self.__A = kernels.sigmoid(Z, out=Z)
         return self.__A
 
     def cost(self, Y, A):
         """Calculates the cost of the model using logistic regression"""
-        m = Y.shape[1]
-        cost = -1/m * np.sum(np.multiply(np.log(A), Y) + np.multiply(
-            np.log(1.0000001 - A), (1 - Y)))
-        return cost
+        return kernels.binary_cross_entropy(Y, A)
 
     def evaluate(self, X, Y):
         """Evaluates the neuron’s predictions"""
-        A = self.forward_prop(X)
-        cost = self.cost(Y, A)
-        prediction = A.round().astype(int)
+        X = X.astype(self.__dtype, copy=False)
+        Z = np.matmul(self.__W, X) + self.__b
+        self.__A, cost = kernels.sigmoid_cross_entropy(Z, Y, out=Z)
+        prediction = self.__A.round().astype(int)
         return prediction, cost
 
     def gradient_descent(self, X, Y, A, alpha=0.05):
         """Calculates one pass of gradient descent on the neuron"""
         m = len(A[0])
-        dZ = A - Y
+        X = X.astype(self.__dtype, copy=False)
+        dZ = A - Y.astype(self.__dtype, copy=False)
         dW = np.matmul(X, dZ.T) / m
         db = np.sum(dZ) / m
         self.__W = self.__W - alpha * dW.T
@@ -74,6 +83,8 @@ class Neuron:
                 raise TypeError("step must be an integer")
             if step <= 0 or step > iterations:
                 raise ValueError("step must be positive and <= iterations")
+        X = X.astype(self.__dtype, copy=False)
+        Y = Y.astype(self.__dtype, copy=False)
         iteration_list = []
         cost_list = []
         for i in range(iterations + 1):
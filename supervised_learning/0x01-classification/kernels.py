@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Numerically stable activation and cost kernels shared by Neuron,
+NeuralNetwork and DeepNeuralNetwork
+
+Every kernel takes an optional out array, which may be its input (but
+not the incoming gradient dA of the backward kernels), to write its
+result into instead of allocating a new one
+"""
+import numpy as np
+
+
+def sigmoid(Z, out=None):
+    """Sigmoid of Z, as (1 + tanh(Z / 2)) / 2 so that it never
+    overflows"""
+    out = np.multiply(Z, 0.5, out=out)
+    np.tanh(out, out=out)
+    out += 1
+    out *= 0.5
+    return out
+
+
+def sigmoid_backward(A, dA, out=None):
+    """Gradient with respect to Z of A = sigmoid(Z), from the gradient
+    dA with respect to A"""
+    out = np.multiply(A, A, out=out)
+    np.subtract(A, out, out=out)
+    out *= dA
+    return out
+
+
+def tanh(Z, out=None):
+    """Hyperbolic tangent of Z"""
+    return np.tanh(Z, out=out)
+
+
+def tanh_backward(A, dA, out=None):
+    """Gradient with respect to Z of A = tanh(Z), from the gradient dA
+    with respect to A"""
+    out = np.multiply(A, A, out=out)
+    np.subtract(1, out, out=out)
+    out *= dA
+    return out
+
+
+def log_softmax(Z, out=None):
+    """Logarithm of the softmax of Z over its first axis, shifted by the
+    maximum of each column so that it never overflows"""
+    out = np.subtract(Z, np.amax(Z, axis=0, keepdims=True), out=out)
+    out -= np.log(np.sum(np.exp(out), axis=0, keepdims=True))
+    return out
+
+
+def softmax(Z, out=None):
+    """Softmax of Z over its first axis, shifted by the maximum of each
+    column so that it never overflows"""
+    out = np.subtract(Z, np.amax(Z, axis=0, keepdims=True), out=out)
+    np.exp(out, out=out)
+    out /= np.sum(out, axis=0, keepdims=True)
+    return out
+
+
+def softmax_cross_entropy(Z, Y, out=None):
+    """Softmax A of the logits Z and the cross-entropy cost of A for the
+    one-hot labels Y, in one pass without taking the log of A
+
+    Returns: A, cost
+    """
+    m = Z.shape[1]
+    out = np.subtract(Z, np.amax(Z, axis=0, keepdims=True), out=out)
+    cross = np.einsum('ij,ij->', Y, out)
+    np.exp(out, out=out)
+    total = np.sum(out, axis=0, keepdims=True)
+    out /= total
+    cost = -(cross - np.dot(np.sum(Y, axis=0), np.log(total[0]))) / m
+    return out, cost
+
+
+def sigmoid_cross_entropy(Z, Y, out=None):
+    """Sigmoid A of the logits Z and the logistic regression cost of A
+    for the labels Y, computed from Z so that it stays finite when A
+    rounds to 0 or 1
+
+    Returns: A, cost
+    """
+    m = Z.shape[1]
+    cost = (np.sum(np.logaddexp(0, Z)) - np.einsum('ij,ij->', Y, Z)) / m
+    return sigmoid(Z, out=out), cost
+
+
+def cross_entropy(Y, A):
+    """Cross-entropy cost of the probabilities A for the one-hot labels
+    Y, with A kept away from 0"""
+    m = A.shape[1]
+    tiny = np.finfo(A.dtype).tiny
+    return -np.einsum('ij,ij->', Y, np.log(np.maximum(A, tiny))) / m
+
+
+def binary_cross_entropy(Y, A):
+    """Logistic regression cost of the probabilities A for the labels Y,
+    with A kept away from 0 and 1"""
+    m = A.shape[1]
+    eps = np.finfo(A.dtype).eps
+    A = np.clip(A, eps, 1 - eps)
+    return -np.sum(Y * np.log(A) + (1 - Y) * np.log1p(-A)) / m
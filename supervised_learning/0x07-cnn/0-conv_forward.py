@@ -4,10 +4,199 @@ Perform forward propagation over a
 convolutional layer of a NN
 """
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+def windows(A, kh, kw, sh, sw):
+    """
+    Strided view of every (kh, kw) window of A, without copying.
+    Attributes:
+        A is a numpy.ndarray of shape (m, h, w, c)
+        kh, kw is the size of the windows
+        sh, sw is the stride between windows
+    Returns:
+        a read-only numpy.ndarray of shape (m, h_out, w_out, kh, kw, c)
+    """
+    m, h, w, c = A.shape
+    h_out = (h - kh) // sh + 1
+    w_out = (w - kw) // sw + 1
+    s_m, s_h, s_w, s_c = A.strides
+    return np.lib.stride_tricks.as_strided(
+        A, shape=(m, h_out, w_out, kh, kw, c),
+        strides=(s_m, s_h * sh, s_w * sw, s_h, s_w, s_c), writeable=False)
+
+
+def shard(layer, A_prev, out, workers, *args, **kwargs):
+    """
+    Runs a layer on workers slices of the batch axis in a thread pool
+    (NumPy releases the GIL), each slice writing into its part of out.
+    Attributes:
+        layer is the layer function, taking an out keyword argument
+        A_prev is a numpy.ndarray of shape (m, ...) split over workers
+        out is the preallocated output of shape (m, ...)
+        workers is the number of threads
+        args and kwargs are passed on to layer
+    Returns:
+        out
+    """
+    bounds = np.linspace(0, A_prev.shape[0], workers + 1).astype(int)
+    with ThreadPoolExecutor(workers) as pool:
+        futures = [pool.submit(layer, A_prev[start:stop], *args,
+                               out=out[start:stop], **kwargs)
+                   for start, stop in zip(bounds[:-1], bounds[1:])
+                   if start < stop]
+        for future in futures:
+            future.result()
+    return out
+
+
+def conv_direct(image, W, stride, out):
+    """
+    Direct convolution: accumulates one (c_prev, c_new) product per
+    kernel offset over the whole batch, without building im2col rows.
+    Attributes:
+        image is the padded input of shape (m, h, w, c_prev)
+        W is a numpy.ndarray of shape (kh, kw, c_prev, c_new)
+        stride is a tuple of (sh, sw)
+        out is the output of shape (m, h_out, w_out, c_new)
+    """
+    kh, kw, _, _ = W.shape
+    sh, sw = stride
+    _, h_out, w_out, _ = out.shape
+    out.fill(0)
+    for i in range(kh):
+        for j in range(kw):
+            out += np.matmul(image[:, i:i + (h_out - 1) * sh + 1:sh,
+                                   j:j + (w_out - 1) * sw + 1:sw], W[i, j])
+    return out
+
+
+def conv_im2col(image, W, stride, out):
+    """
+    im2col convolution: a single GEMM of every kernel window against the
+    kernels, see conv_direct for the attributes
+    """
+    kh, kw, _, c_new = W.shape
+    cols = windows(image, kh, kw, *stride).reshape(-1, kh * kw * W.shape[2])
+    np.matmul(cols, W.reshape(-1, c_new), out=out.reshape(-1, c_new))
+    return out
+
+
+def conv_fft(image, W, stride, out):
+    """
+    FFT convolution: a product per frequency of the transforms of the
+    images and of the flipped kernels, see conv_direct for the attributes
+    """
+    kh, kw, _, _ = W.shape
+    sh, sw = stride
+    _, h, w, _ = image.shape
+    _, h_out, w_out, _ = out.shape
+    f_image = np.fft.rfft2(image, axes=(1, 2)).transpose(1, 2, 0, 3)
+    f_kernel = np.fft.rfft2(W[::-1, ::-1], s=(h, w), axes=(0, 1))
+    f_out = np.matmul(f_image, f_kernel).transpose(2, 0, 1, 3)
+    full = np.fft.irfft2(f_out, s=(h, w), axes=(1, 2))
+    out[...] = full[:, kh - 1:kh - 1 + (h_out - 1) * sh + 1:sh,
+                    kw - 1:kw - 1 + (w_out - 1) * sw + 1:sw]
+    return out
+
+
+WINOGRAD_G = np.array([[1, 0, 0], [0.5, 0.5, 0.5],
+                       [0.5, -0.5, 0.5], [0, 0, 1]])
+
+
+def winograd_input(d0, d1, d2, d3):
+    """
+    Applies B^T of Winograd F(2, 3) to the four rows of the input tiles
+    """
+    return d0 - d2, d1 + d2, d2 - d1, d1 - d3
+
+
+def winograd_output(m0, m1, m2, m3):
+    """
+    Applies A^T of Winograd F(2, 3) to the four rows of the product tiles
+    """
+    return m0 + m1 + m2, m1 - m2 - m3
+
+
+def conv_winograd(image, W, stride, out):
+    """
+    Winograd F(2x2, 3x3) convolution, only for 3x3 kernels with a
+    stride of 1: each 4x4 input tile gives a 2x2 output tile with 16
+    instead of 36 multiplications, see conv_direct for the attributes
+    """
+    kh, kw, c_prev, c_new = W.shape
+    if (kh, kw) != (3, 3) or tuple(stride) != (1, 1):
+        raise ValueError('winograd needs 3x3 kernels and a stride of 1')
+    m, h_out, w_out, _ = out.shape
+    th = (h_out + 1) // 2
+    tw = (w_out + 1) // 2
+    image = np.pad(image, ((0, 0), (0, 2 * th + 2 - image.shape[1]),
+                           (0, 2 * tw + 2 - image.shape[2]), (0, 0)))
+
+    # the transforms are applied to strided slices of the whole batch:
+    # row i of every tile is image[:, i::2], column j is [:, :, j::2]
+    U = np.einsum('ai,ijcn,bj->abcn', WINOGRAD_G, W, WINOGRAD_G)
+    rows = winograd_input(*[image[:, i:i + 2 * th:2] for i in range(4)])
+    V = np.empty((4, 4, m, th, tw, c_prev))
+    for a, row in enumerate(rows):
+        V[a] = winograd_input(*[row[:, :, j:j + 2 * tw:2] for j in range(4)])
+
+    M = np.matmul(V.reshape(4, 4, -1, c_prev), U).reshape(
+        4, 4, m, th, tw, c_new)
+    full = np.empty((m, 2 * th, 2 * tw, c_new))
+    for p, row in enumerate(winograd_output(*M)):
+        for q, tile in enumerate(winograd_output(*row)):
+            full[:, p::2, q::2] = tile
+    out[...] = full[:, :h_out, :w_out]
+    return out
+
+
+CONV_BACKENDS = {'direct': conv_direct, 'im2col': conv_im2col,
+                 'fft': conv_fft, 'winograd': conv_winograd}
+
+# backend picked by auto for (kernel, stride of 1, large input), where
+# kernel is '3x3', 'small' (up to 5x5) or 'large', and an input is
+# large from 56x56; tuned with 102-conv_backends_benchmark.py
+AUTO_BACKENDS = {
+    ('3x3', True, False): 'direct',
+    ('3x3', True, True): 'direct',
+    ('3x3', False, False): 'im2col',
+    ('3x3', False, True): 'im2col',
+    ('small', True, False): 'fft',
+    ('small', True, True): 'direct',
+    ('small', False, False): 'direct',
+    ('small', False, True): 'direct',
+    ('large', True, False): 'im2col',
+    ('large', True, True): 'im2col',
+    ('large', False, False): 'im2col',
+    ('large', False, True): 'im2col',
+}
+
+
+def auto_backend(image_shape, kernel_shape, stride):
+    """
+    Picks the convolution backend for a layer from AUTO_BACKENDS
+    Attributes:
+        image_shape is the shape (m, h, w, c_prev) of the padded input
+        kernel_shape is the shape (kh, kw, c_prev, c_new) of W
+        stride is a tuple of (sh, sw)
+    Returns:
+        the name of a backend in CONV_BACKENDS
+    """
+    kh, kw, _, _ = kernel_shape
+    if (kh, kw) == (3, 3):
+        kernel = '3x3'
+    elif max(kh, kw) <= 5:
+        kernel = 'small'
+    else:
+        kernel = 'large'
+    large = min(image_shape[1], image_shape[2]) >= 56
+    return AUTO_BACKENDS[(kernel, tuple(stride) == (1, 1), large)]
 
 
 def conv_forward(A_prev, W, b, activation,
-                 padding="same", stride=(1, 1)):
+                 padding="same", stride=(1, 1), workers=None, out=None,
+                 backend='auto'):
     """
     Performs forward prop over a convolutional layer of a NN.
     Attributes:
@@ -37,6 +226,16 @@ def conv_forward(A_prev, W, b, activation,
         for the convolution
             sh: stride for the height
             sw: stride for the width
+
+        workers: if more than 1, the batch is split over this many
+        threads, see shard
+
+        out: an optional preallocated numpy.ndarray of shape
+        (m, h_out, w_out, c_new) the output is written into
+
+        backend: the convolution algorithm, one of 'direct', 'im2col',
+        'fft', 'winograd' (3x3 kernels with a stride of 1 only) or
+        'auto' to pick one from the layer shape, see auto_backend
     Returns:
         Output of the convolutional layer
     """
@@ -54,6 +253,11 @@ def conv_forward(A_prev, W, b, activation,
 
     h_out = (h_prev - kh + 2 * ph) // sh + 1
     w_out = (w_prev - kw + 2 * pw) // sw + 1
+    if out is None:
+        out = np.empty((m, h_out, w_out, c_new))
+    if workers is not None and workers > 1 and m > 1:
+        return shard(conv_forward, A_prev, out, workers, W, b, activation,
+                     padding, stride, backend=backend)
 
     image = np.pad(
                    A_prev,
@@ -63,18 +267,9 @@ def conv_forward(A_prev, W, b, activation,
                               (0, 0)),
                    mode='constant',
                    constant_values=0)
-    output = np.zeros((m, h_out, w_out, c_new))
-
-    for h in range(h_out):
-        for w in range(w_out):
-            for cn in range(c_new):
-                output[:, h, w, cn] = \
-                    (W[:, :, :, cn] *
-                     image[:,
-                     h * sh: h * sh + kh,
-                     w * sw: w * sw + kw,
-                     :]).sum(axis=(1, 2, 3))
-                output[:, h, w, cn] = \
-                    (activation(output[:, h, w, cn] +
-                                b[0, 0, 0, cn]))
-    return output
+    if backend == 'auto':
+        backend = auto_backend(image.shape, W.shape, stride)
+    CONV_BACKENDS[backend](image, W, stride, out)
+    out += b
+    out[...] = activation(out)
+    return out
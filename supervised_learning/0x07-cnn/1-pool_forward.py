@@ -3,9 +3,12 @@
 Perform forward propagation over a pooling layer of a newral nerwork
 """
 import numpy as np
+windows = __import__('0-conv_forward').windows
+shard = __import__('0-conv_forward').shard
 
 
-def pool_forward(A_prev, kernel_shape, stride=(1, 1), mode='max'):
+def pool_forward(A_prev, kernel_shape, stride=(1, 1), mode='max',
+                 cache=None, workers=None, out=None):
     """
     Performs forward propagation over a pooling layer of a neural network.
 
@@ -26,6 +29,14 @@ def pool_forward(A_prev, kernel_shape, stride=(1, 1), mode='max'):
         sw: stride for the width
     mode: string containing either max or avg, indicating
         whether to perform maximum or average pooling, respectively
+    cache: if a dict is given and mode is max, cache['argmax'] is set to
+        a numpy.ndarray of shape (m, h_out, w_out, c_prev) containing the
+        index of the maximum within each flattened (kh, kw) window, for
+        the backward pass
+    workers: if more than 1, the batch is split over this many threads,
+        see shard
+    out: an optional preallocated numpy.ndarray of shape
+        (m, h_out, w_out, c_prev) the output is written into
 
     Returns:
         The output of the pooling layer
@@ -34,21 +45,31 @@ def pool_forward(A_prev, kernel_shape, stride=(1, 1), mode='max'):
     kh, kw = kernel_shape
     sh, sw = stride
 
-    h_out = (h_prev - kh) // sh + 1
-    w_out = (w_prev - kw) // sw + 1
-
-    output = np.zeros((m, h_out, w_out, c_prev))
-
-    for h in range(h_out):
-        for w in range(w_out):
-            x1 = h * sh
-            x2 = kh + h * sh
-            y1 = w * sw
-            y2 = kw + w * sw
-            if mode == 'max':
-                output[:, h, w, :] = \
-                    np.max(A_prev[:, x1:x2, y1:y2], axis=(1, 2))
-            if mode == 'avg':
-                output[:, h, w, :] = \
-                    np.mean(A_prev[:, x1:x2, y1:y2], axis=(1, 2))
+    blocks = windows(A_prev, kh, kw, sh, sw)
+    output = out
+    if output is None:
+        output = np.empty(blocks.shape[:3] + (c_prev,))
+
+    if workers is not None and workers > 1 and m > 1:
+        shard(pool_forward, A_prev, output, workers, kernel_shape, stride,
+              mode)
+    else:
+        # reduce one window offset at a time over the whole tensor, which
+        # is much faster than reducing the small (kh, kw) axes of the view
+        np.copyto(output, blocks[:, :, :, 0, 0])
+        reduce = np.add if mode == 'avg' else np.maximum
+        for i in range(kh):
+            for j in range(kw):
+                if i or j:
+                    reduce(output, blocks[:, :, :, i, j], out=output)
+        if mode == 'avg':
+            output /= kh * kw
+
+    if mode == 'max' and cache is not None:
+        # the first maximum of each window wins, as with numpy.argmax
+        argmax = np.zeros(output.shape, dtype=int)
+        for k in reversed(range(kh * kw)):
+            np.copyto(argmax, k,
+                      where=blocks[:, :, :, k // kw, k % kw] == output)
+        cache['argmax'] = argmax
     return output
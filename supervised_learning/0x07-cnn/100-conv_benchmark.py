@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark conv_forward against the original loop implementation
+across layer sizes
+"""
+import numpy as np
+import time
+conv_forward = __import__('0-conv_forward').conv_forward
+
+
+def loop_conv_forward(A_prev, W, b, activation, padding="same",
+                      stride=(1, 1)):
+    """
+    Reference convolution looping over every output pixel and channel
+    """
+    m, h_prev, w_prev, c_prev = A_prev.shape
+    kh, kw, c_prev, c_new = W.shape
+    sh, sw = stride
+
+    if padding == 'same':
+        ph = ((h_prev - 1) * sh + kh - h_prev) // 2
+        pw = ((w_prev - 1) * sw + kw - w_prev) // 2
+    else:
+        ph = 0
+        pw = 0
+
+    h_out = (h_prev - kh + 2 * ph) // sh + 1
+    w_out = (w_prev - kw + 2 * pw) // sw + 1
+
+    image = np.pad(A_prev, ((0, 0), (ph, ph), (pw, pw), (0, 0)))
+    output = np.zeros((m, h_out, w_out, c_new))
+
+    for h in range(h_out):
+        for w in range(w_out):
+            for cn in range(c_new):
+                output[:, h, w, cn] = activation(
+                    (W[:, :, :, cn] *
+                     image[:, h * sh: h * sh + kh,
+                           w * sw: w * sw + kw, :]).sum(axis=(1, 2, 3)) +
+                    b[0, 0, 0, cn])
+    return output
+
+
+def relu(Z):
+    """
+    Rectified linear unit
+    """
+    return np.maximum(Z, 0)
+
+
+def timeit(f, *args, **kwargs):
+    """
+    Returns the output and the running time of f in seconds
+    """
+    start = time.perf_counter()
+    out = f(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    layers = [
+        # (m, h, w, c_prev, kh, kw, c_new, padding, stride)
+        (64, 28, 28, 1, 5, 5, 6, 'same', (1, 1)),
+        (64, 14, 14, 6, 5, 5, 16, 'valid', (1, 1)),
+        (64, 28, 28, 32, 3, 3, 32, 'same', (1, 1)),
+        (16, 56, 56, 64, 3, 3, 64, 'same', (1, 1)),
+        (8, 112, 112, 3, 7, 7, 64, 'same', (2, 2)),
+    ]
+    print('{:>34} {:>10} {:>10} {:>8}'.format(
+        'layer', 'loop', 'auto', 'speedup'))
+    for m, h, w, c_prev, kh, kw, c_new, padding, stride in layers:
+        A_prev = np.random.randn(m, h, w, c_prev)
+        W = np.random.randn(kh, kw, c_prev, c_new)
+        b = np.random.randn(1, 1, 1, c_new)
+        old, t_old = timeit(loop_conv_forward, A_prev, W, b, relu,
+                            padding, stride)
+        new, t_new = timeit(conv_forward, A_prev, W, b, relu,
+                            padding, stride)
+        assert np.allclose(old, new)
+        layer = '{}x{}x{}x{} * {}x{}x{} {}'.format(
+            m, h, w, c_prev, kh, kw, c_new, padding)
+        print('{:>34} {:>10.4f} {:>10.4f} {:>7.1f}x'.format(
+            layer, t_old, t_new, t_old / t_new))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark the batch-sharded conv_forward and pool_forward from one
+thread to one per core on a large batch of images
+"""
+import numpy as np
+import os
+import time
+conv_forward = __import__('0-conv_forward').conv_forward
+pool_forward = __import__('1-pool_forward').pool_forward
+
+
+def relu(Z):
+    """
+    Rectified linear unit
+    """
+    return np.maximum(Z, 0)
+
+
+def best_time(f, *args, repeat=3, **kwargs):
+    """
+    Returns the best running time of f in seconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    A_prev = np.random.randn(2048, 28, 28, 1)
+    W = np.random.randn(5, 5, 1, 6)
+    b = np.random.randn(1, 1, 1, 6)
+    A = conv_forward(A_prev, W, b, relu)
+    conv_out = np.empty_like(A)
+    pool_out = np.empty((2048, 14, 14, 6))
+
+    print('{:>7} {:>10} {:>8} {:>10} {:>8}'.format(
+        'workers', 'conv', 'speedup', 'pool', 'speedup'))
+    workers = 1
+    while True:
+        t_conv = best_time(conv_forward, A_prev, W, b, relu,
+                           workers=workers, out=conv_out)
+        t_pool = best_time(pool_forward, A, (2, 2), (2, 2),
+                           workers=workers, out=pool_out)
+        if workers == 1:
+            base_conv, base_pool = t_conv, t_pool
+        print('{:>7} {:>10.4f} {:>7.1f}x {:>10.4f} {:>7.1f}x'.format(
+            workers, t_conv, base_conv / t_conv, t_pool,
+            base_pool / t_pool))
+        if workers >= os.cpu_count():
+            break
+        workers = min(2 * workers, os.cpu_count())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of the conv_forward backends, checking them against the
+direct convolution, and print the AUTO_BACKENDS table it suggests
+"""
+import numpy as np
+import time
+conv = __import__('0-conv_forward')
+
+# one representative layer (kernel, c_prev, c_new) per kind of kernel
+KERNELS = {'3x3': (3, 64, 64), 'small': (5, 32, 32), 'large': (7, 3, 64)}
+# one representative (m, h) input for small and large inputs
+INPUTS = {False: (32, 28), True: (8, 112)}
+
+
+def best_time(f, *args, repeat=3):
+    """
+    Returns the output of f and its best running time in seconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = f(*args)
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    table = {}
+    for kernel, (k, c_prev, c_new) in KERNELS.items():
+        for unit in (True, False):
+            stride = (1, 1) if unit else (2, 2)
+            for large, (m, h) in INPUTS.items():
+                A_prev = np.random.randn(m, h, h, c_prev)
+                W = np.random.randn(k, k, c_prev, c_new)
+                b = np.zeros((1, 1, 1, c_new))
+                times = {}
+                reference = None
+                for backend in conv.CONV_BACKENDS:
+                    try:
+                        out, times[backend] = best_time(
+                            conv.conv_forward, A_prev, W, b,
+                            lambda Z: Z, 'same', stride, None, None,
+                            backend)
+                    except ValueError:
+                        continue
+                    if reference is None:
+                        reference = out
+                    assert np.allclose(out, reference, atol=1e-6)
+                best = min(times, key=times.get)
+                table[(kernel, unit, large)] = best
+                print('{:>5} stride {} {:>3}x{:<3} {} -> {}'.format(
+                    kernel, stride[0], h, h,
+                    ' '.join('{} {:.4f}'.format(name, t)
+                             for name, t in times.items()), best))
+
+    print('AUTO_BACKENDS = {')
+    for key, backend in table.items():
+        print('    {}: {!r},'.format(key, backend))
+    print('}')
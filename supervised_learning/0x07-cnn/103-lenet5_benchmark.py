@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Compare the NumPy LeNet-5 plan with the Keras lenet5 model: same
+predictions, cold-start time and throughput in images per second
+"""
+import numpy as np
+import os
+import tempfile
+import time
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    X = np.random.rand(10000, 28, 28)
+    folder = tempfile.mkdtemp()
+    filename = os.path.join(folder, 'lenet5.npz')
+
+    start = time.perf_counter()
+    import tensorflow.keras as K
+    lenet5 = __import__('5-lenet5').lenet5
+    model = lenet5(K.Input(shape=(28, 28, 1)))
+    model.predict(X[:1].reshape(-1, 28, 28, 1))
+    keras_cold = time.perf_counter() - start
+
+    LeNet5 = __import__('6-lenet5_numpy').LeNet5
+    LeNet5.from_keras(model).save(filename)
+    start = time.perf_counter()
+    lenet = LeNet5.load(filename)
+    lenet.predict(X[:1])
+    numpy_cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    Y_keras = model.predict(X.reshape(-1, 28, 28, 1), batch_size=256)
+    keras_time = time.perf_counter() - start
+    start = time.perf_counter()
+    Y_numpy = lenet.predict(X, batch_size=256)
+    numpy_time = time.perf_counter() - start
+
+    assert np.allclose(Y_keras, Y_numpy, atol=1e-5)
+    assert np.array_equal(Y_keras.argmax(1), Y_numpy.argmax(1))
+    print('{:>6} {:>14} {:>12}'.format('', 'cold start (s)', 'images/s'))
+    print('{:>6} {:>14.3f} {:>12.0f}'.format(
+        'keras', keras_cold, len(X) / keras_time))
+    print('{:>6} {:>14.3f} {:>12.0f}'.format(
+        'numpy', numpy_cold, len(X) / numpy_time))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Perform back propagation over a
+convolutional layer of a NN
+"""
+import numpy as np
+windows = __import__('0-conv_forward').windows
+
+
+def workspace_buffer(workspace, name, shape, dtype=float, zero=False):
+    """
+    Returns the buffer called name from workspace, only allocating it
+    when it is missing or its shape or dtype changed.
+    Attributes:
+        workspace: a dict of buffers kept across calls, or None to
+            allocate a new buffer
+        name: the name of the buffer
+        shape: the shape of the buffer
+        dtype: the dtype of the buffer
+        zero: if True, the buffer is filled with zeros
+    """
+    buffer = None if workspace is None else workspace.get(name)
+    if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+        buffer = np.empty(shape, dtype=dtype)
+        if workspace is not None:
+            workspace[name] = buffer
+    if zero:
+        buffer.fill(0)
+    return buffer
+
+
+def conv_backward(dZ, A_prev, W, b, padding="same", stride=(1, 1),
+                  workspace=None):
+    """
+    Performs back propagation over a convolutional layer of a NN.
+    Attributes:
+        dZ is a numpy.ndarray of shape (m, h_new, w_new, c_new)
+        containing the partial derivatives with respect to the
+        unactivated output of the convolutional layer
+            m is the number of examples
+            h_new is the height of the output
+            w_new is the width of the output
+            c_new is the number of channels in the output
+
+        A_prev is a numpy.ndarray of shape (m, h_prev, w_prev, c_prev)
+        containing the output of the previous layer
+
+        W is a numpy.ndarray of shape (kh, kw, c_prev, c_new)
+        containing the kernels for the convolution
+
+        b is a numpy.ndarray of shape (1, 1, 1, c_new)
+        containing the biases applied to the convolution
+
+        padding: string that is either same or valid,
+            indicating the type of padding used.
+
+        stride: tuple of (sh, sw) containing the strides
+        for the convolution
+
+        workspace: a dict of buffers reused across calls (see
+            workspace_buffer), so that repeated steps on batches of the
+            same shape do not reallocate the gradients; the returned
+            gradients are then overwritten by the next call
+    Returns:
+        the partial derivatives with respect to the previous layer
+        (dA_prev), the kernels (dW), and the biases (db), respectively
+    """
+    m, h_prev, w_prev, c_prev = A_prev.shape
+    _, h_new, w_new, c_new = dZ.shape
+    kh, kw, _, _ = W.shape
+    sh, sw = stride
+
+    if padding == 'same':
+        ph = ((h_prev - 1) * sh + kh - h_prev) // 2
+        pw = ((w_prev - 1) * sw + kw - w_prev) // 2
+
+    if padding == 'valid':
+        ph = 0
+        pw = 0
+
+    image = np.pad(
+                   A_prev,
+                   pad_width=((0, 0),
+                              (ph, ph),
+                              (pw, pw),
+                              (0, 0)),
+                   mode='constant',
+                   constant_values=0)
+
+    # im2col: one row per output pixel, one column per kernel weight
+    rows = m * h_new * w_new
+    cols = workspace_buffer(workspace, 'cols', (rows, kh * kw * c_prev))
+    cols.reshape(m, h_new, w_new, kh, kw, c_prev)[...] = \
+        windows(image, kh, kw, sh, sw)[:, :h_new, :w_new]
+    dZ_rows = dZ.reshape(rows, c_new)
+
+    db = workspace_buffer(workspace, 'db', (1, 1, 1, c_new))
+    np.sum(dZ_rows, axis=0, out=db.reshape(c_new))
+    dW = workspace_buffer(workspace, 'dW', W.shape)
+    np.matmul(cols.T, dZ_rows, out=dW.reshape(-1, c_new))
+
+    # col2im: scatter-add the gradient of each kernel offset at once
+    dcols = np.matmul(dZ_rows, W.reshape(-1, c_new).T, out=cols).reshape(
+        m, h_new, w_new, kh, kw, c_prev)
+    dimage = workspace_buffer(workspace, 'dimage', image.shape, zero=True)
+    for i in range(kh):
+        for j in range(kw):
+            dimage[:, i:i + h_new * sh:sh, j:j + w_new * sw:sw] += \
+                dcols[:, :, :, i, j]
+
+    dA_prev = dimage[:, ph:ph + h_prev, pw:pw + w_prev]
+    return dA_prev, dW, db
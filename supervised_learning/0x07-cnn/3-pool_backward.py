@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Perform back propagation over a pooling layer of a neural network
+"""
+import numpy as np
+pool_forward = __import__('1-pool_forward').pool_forward
+workspace_buffer = __import__('2-conv_backward').workspace_buffer
+
+
+def pool_backward(dA, A_prev, kernel_shape, stride=(1, 1), mode='max',
+                  cache=None, workspace=None):
+    """
+    Performs back propagation over a pooling layer of a neural network.
+
+    Arguments:
+
+    dA: numpy.ndarray of shape (m, h_new, w_new, c_new) containing the
+            partial derivatives with respect to the output of the
+            pooling layer
+        m: number of examples
+        h_new: height of the output
+        w_new: width of the output
+        c_new: number of channels
+    A_prev: numpy.ndarray of shape (m, h_prev, w_prev, c) containing
+            the output of the previous layer
+    kernel_shape: tuple of (kh, kw) containing the size
+            of the kernel for the pooling
+    stride: tuple of (sh, sw) containing the strides for the pooling
+    mode: string containing either max or avg, indicating
+        whether to perform maximum or average pooling, respectively
+    cache: the cache filled by pool_forward in max mode; if it does not
+        hold the argmax, it is computed again from A_prev
+    workspace: a dict of buffers reused across calls, see
+        workspace_buffer; the returned gradient is then overwritten by
+        the next call
+
+    Returns:
+        The partial derivatives with respect to the previous layer
+        (dA_prev)
+    """
+    _, h_new, w_new, _ = dA.shape
+    kh, kw = kernel_shape
+    sh, sw = stride
+
+    dA_prev = workspace_buffer(workspace, 'dA_prev', A_prev.shape,
+                               zero=True)
+
+    if mode == 'avg':
+        share = dA / (kh * kw)
+    else:
+        if cache is None or 'argmax' not in cache:
+            cache = {}
+            pool_forward(A_prev, kernel_shape, stride, mode, cache)
+        argmax = cache['argmax']
+
+    # scatter-add the gradient of each window offset at once
+    for i in range(kh):
+        for j in range(kw):
+            if mode == 'avg':
+                grad = share
+            else:
+                grad = np.where(argmax == i * kw + j, dA, 0)
+            dA_prev[:, i:i + h_new * sh:sh, j:j + w_new * sw:sw] += grad
+
+    return dA_prev
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Run inference of the modified LeNet-5 architecture of 5-lenet5.py
+with NumPy only, without starting TensorFlow
+"""
+import numpy as np
+conv_forward = __import__('0-conv_forward').conv_forward
+pool_forward = __import__('1-pool_forward').pool_forward
+
+
+def relu(Z):
+    """
+    Rectified linear unit, computed in place
+    """
+    return np.maximum(Z, 0, out=Z)
+
+
+class LeNet5():
+    """
+    Array-backed inference plan of the modified LeNet-5: conv, pool,
+    conv, pool and three dense layers, chained through intermediate
+    buffers that are allocated once per batch size and reused
+    """
+    def __init__(self, weights):
+        """
+        class constructor:
+            weights is the list returned by get_weights() on the model
+                built by lenet5: the kernel and bias of each layer
+        Public instance attributes:
+            weights: the list of kernels and biases
+            buffers: the intermediate outputs of the last batch size
+        """
+        self.weights = [np.asarray(w, dtype=float) for w in weights]
+        for i in (1, 3):
+            self.weights[i] = self.weights[i].reshape(1, 1, 1, -1)
+        self.buffers = None
+
+    @classmethod
+    def from_keras(cls, model):
+        """
+        Builds the plan from a trained lenet5 Keras model
+        """
+        return cls(model.get_weights())
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Builds the plan from weights saved by save, without TensorFlow
+        """
+        with np.load(filename) as lib:
+            return cls([lib['arr_{}'.format(i)] for i in range(len(lib))])
+
+    def save(self, filename):
+        """
+        Saves the weights to a .npz file
+        """
+        np.savez(filename, *self.weights)
+
+    def allocate(self, m, h, w):
+        """
+        Allocates the intermediate buffers for batches of m images of
+            shape (h, w, 1)
+        """
+        c1 = self.weights[0].shape[3]
+        c2 = self.weights[2].shape[3]
+        k2 = self.weights[2].shape[0]
+        h1, w1 = h // 2, w // 2
+        h2, w2 = h1 - k2 + 1, w1 - k2 + 1
+        shapes = [(m, h, w, c1), (m, h1, w1, c1), (m, h2, w2, c2),
+                  (m, h2 // 2, w2 // 2, c2)]
+        shapes += [(m, W.shape[1]) for W in self.weights[4::2]]
+        self.buffers = [np.empty(shape) for shape in shapes]
+
+    def forward(self, X):
+        """
+        Runs one batch through the plan
+        Arguments:
+            X is a numpy.ndarray of shape (m, h, w) or (m, h, w, 1)
+        Returns:
+            a view of the output buffer of shape (m, classes) containing
+                the softmax probabilities, overwritten by the next call
+        """
+        m, h, w = X.shape[:3]
+        X = X.reshape(m, h, w, 1)
+        if (self.buffers is None or self.buffers[0].shape[0] < m or
+                self.buffers[0].shape[1:3] != (h, w)):
+            self.allocate(m, h, w)
+        conv1, pool1, conv2, pool2, *dense = [b[:m] for b in self.buffers]
+        W1, b1, W2, b2 = self.weights[:4]
+
+        conv_forward(X, W1, b1, relu, padding='same', out=conv1)
+        pool_forward(conv1, (2, 2), (2, 2), out=pool1)
+        conv_forward(pool1, W2, b2, relu, padding='valid', out=conv2)
+        pool_forward(conv2, (2, 2), (2, 2), out=pool2)
+
+        A = pool2.reshape(m, -1)
+        for i, out in enumerate(dense):
+            np.matmul(A, self.weights[4 + 2 * i], out=out)
+            out += self.weights[5 + 2 * i]
+            if i < len(dense) - 1:
+                relu(out)
+            A = out
+
+        A -= A.max(axis=1, keepdims=True)
+        np.exp(A, out=A)
+        A /= A.sum(axis=1, keepdims=True)
+        return A
+
+    def predict(self, X, batch_size=256):
+        """
+        Streams X through the plan batch_size images at a time
+        Returns:
+            a numpy.ndarray of shape (m, classes) containing the softmax
+                probabilities of every image
+        """
+        Y = None
+        for start in range(0, X.shape[0], batch_size):
+            out = self.forward(X[start:start + batch_size])
+            if Y is None:
+                Y = np.empty((X.shape[0], out.shape[1]))
+            Y[start:start + out.shape[0]] = out
+        return Y
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+
+import numpy as np
+LeNet5 = __import__('6-lenet5_numpy').LeNet5
+
+if __name__ == "__main__":
+    np.random.seed(0)
+    lib = np.load('../data/MNIST.npz')
+    X_valid = lib['X_valid']
+    Y_valid = lib['Y_valid']
+
+    # weights saved from a trained lenet5 model with
+    # LeNet5.from_keras(model).save('../data/lenet5.npz')
+    lenet = LeNet5.load('../data/lenet5.npz')
+    Y_pred = lenet.predict(X_valid)
+    print(Y_pred[0])
+    print(np.mean(np.argmax(Y_pred, 1) == Y_valid))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Fold the BatchNormalization layers of a trained model into the
+convolutions before them, for inference
+"""
+import numpy as np
+import tensorflow.keras as K
+inbound_layers = __import__('8-profile').inbound_layers
+call_inputs = __import__('8-profile').call_inputs
+
+
+def foldable(layer, conv, consumers):
+    """
+    Returns True if the BatchNormalization layer can be folded into
+    conv, the layer before it: conv is a linear Conv2D on the channels
+    last axis and layer is its only consumer
+    """
+    if not (isinstance(layer, K.layers.BatchNormalization) and
+            type(conv) is K.layers.Conv2D):
+        return False
+    axis = layer.axis[0] if isinstance(layer.axis, (list, tuple)) \
+        else layer.axis
+    return (axis in (-1, 3) and conv.data_format == 'channels_last' and
+            conv.activation is K.activations.linear and
+            consumers[id(conv)] == 1)
+
+
+def fold(conv, batch_norm):
+    """
+    Returns the kernel and bias of conv followed by batch_norm in
+    inference mode
+    """
+    kernel = K.backend.get_value(conv.kernel)
+    bias = (K.backend.get_value(conv.bias) if conv.use_bias else
+            np.zeros(kernel.shape[-1], dtype=kernel.dtype))
+    mean = K.backend.get_value(batch_norm.moving_mean)
+    variance = K.backend.get_value(batch_norm.moving_variance)
+    gamma = (K.backend.get_value(batch_norm.gamma) if batch_norm.scale
+             else np.ones_like(mean))
+    beta = (K.backend.get_value(batch_norm.beta) if batch_norm.center
+            else np.zeros_like(mean))
+
+    scale = gamma / np.sqrt(variance + batch_norm.epsilon)
+    return kernel * scale, (bias - mean) * scale + beta
+
+
+def fold_batch_norm(model):
+    """
+    Folds the BatchNormalization layers of a trained model into the
+    Conv2D layers they follow directly, like the ones of resnet50 or
+    of the bottlenecks of densenet121
+
+    A BatchNormalization that follows a concatenation or comes before
+    its ReLU and convolution, as in pre-activation blocks, is kept
+
+    Arguments:
+    model is the Keras model
+
+    Returns:
+    a new model, with its own copies of the weights, that computes the
+    same outputs in inference mode with fewer layers
+    """
+    layers = model.layers
+    consumers = {id(layer): 0 for layer in layers}
+    for layer in layers:
+        for inbound in inbound_layers(layer):
+            consumers[id(inbound)] += 1
+    for output in model.outputs:
+        for layer in layers:
+            if layer.output is output:
+                consumers[id(layer)] += 1
+
+    folded = {}
+    for layer in layers:
+        inbound = inbound_layers(layer)
+        if len(inbound) == 1 and foldable(layer, inbound[0], consumers):
+            folded[id(inbound[0])] = layer
+
+    tensors = {}
+    for layer in layers:
+        if id(layer) in folded:
+            continue
+        if isinstance(layer, K.layers.InputLayer):
+            tensors[id(layer)] = K.Input(
+                shape=K.backend.int_shape(layer.output)[1:],
+                dtype=layer.output.dtype, name=layer.name)
+            continue
+        inbound = inbound_layers(layer)
+        if len(inbound) == 1 and id(inbound[0]) in folded:
+            conv, weights = inbound[0], fold(inbound[0], layer)
+            config = conv.get_config()
+            config['use_bias'] = True
+            new = K.layers.Conv2D.from_config(config)
+            inputs = call_inputs(conv, tensors)
+        else:
+            weights = layer.get_weights()
+            new = layer.__class__.from_config(layer.get_config())
+            inputs = call_inputs(layer, tensors)
+        tensors[id(layer)] = new(inputs)
+        new.set_weights(weights)
+
+    def mapped(outputs):
+        """Returns the new tensors standing for outputs of model"""
+        return [tensors[id(layer)] for output in outputs
+                for layer in layers if layer.output is output]
+
+    return K.models.Model(inputs=mapped(model.inputs),
+                          outputs=mapped(model.outputs),
+                          name=model.name + '_folded')
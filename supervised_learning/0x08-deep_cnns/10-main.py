@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+
+import numpy as np
+resnet50 = __import__('4-resnet50').resnet50
+fold_batch_norm = __import__('10-fold_batch_norm').fold_batch_norm
+
+if __name__ == '__main__':
+    model = resnet50()
+    folded = fold_batch_norm(model)
+    print(len(model.layers), len(folded.layers))
+    images = np.random.rand(2, 224, 224, 3).astype(np.float32)
+    print(np.abs(model.predict(images) - folded.predict(images)).max())
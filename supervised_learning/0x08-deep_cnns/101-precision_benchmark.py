@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark the CPU inference throughput and peak memory of the deep CNN
+builders per precision and input resolution, each run in its own
+process so that the peak resident memory is its own
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import resource
+import time
+
+BUILDERS = {'inception': ('1-inception_network', 'inception_network'),
+            'resnet50': ('4-resnet50', 'resnet50'),
+            'densenet121': ('7-densenet121', 'densenet121')}
+
+
+def inference(name, precision, size, batch_size=16, repeat=3):
+    """
+    Builds the model name with precision and size x size inputs and
+    predicts random batches
+
+    Returns:
+    the images per second and the peak resident memory in MB
+    """
+    import numpy as np
+    module, builder = BUILDERS[name]
+    model = getattr(__import__(module), builder)(
+        input_shape=(size, size, 3), precision=precision)
+
+    images = np.random.rand(batch_size, size, size, 3).astype(np.float32)
+    model.predict(images, batch_size=batch_size)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict(images, batch_size=batch_size)
+        best = min(best, time.perf_counter() - start)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return batch_size / best, peak
+
+
+if __name__ == '__main__':
+    context = multiprocessing.get_context('spawn')
+    print('{:<12} {:>5} {:>9} {:>10} {:>9}'.format(
+        'model', 'size', 'precision', 'images/s', 'peak MB'))
+    for name in BUILDERS:
+        for size in [224, 160, 128]:
+            for precision in ['float32', 'float16', 'bfloat16']:
+                with ProcessPoolExecutor(1, mp_context=context) as executor:
+                    speed, peak = executor.submit(
+                        inference, name, precision, size).result()
+                print('{:<12} {:>5} {:>9} {:>10.1f} {:>9.0f}'.format(
+                    name, size, precision, speed, peak))
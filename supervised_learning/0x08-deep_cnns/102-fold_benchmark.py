@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark the CPU latency per image of resnet50 and densenet121 before
+and after folding their batch normalizations into the convolutions
+"""
+import numpy as np
+import tensorflow.keras as K
+import time
+resnet50 = __import__('4-resnet50').resnet50
+densenet121 = __import__('7-densenet121').densenet121
+fold_batch_norm = __import__('10-fold_batch_norm').fold_batch_norm
+
+
+def randomize_batch_norm(model):
+    """
+    Gives the batch normalizations of model random statistics, as
+    after training, so that folding them is not close to an identity
+    """
+    for layer in model.layers:
+        if isinstance(layer, K.layers.BatchNormalization):
+            layer.set_weights([np.random.uniform(0.5, 1.5, w.shape)
+                               if i in (0, 3) else
+                               np.random.uniform(-0.5, 0.5, w.shape)
+                               for i, w in enumerate(layer.get_weights())])
+
+
+def latency(model, images, repeat=5):
+    """
+    Returns the outputs of model and its best time per image in seconds
+    """
+    outputs = model.predict(images, batch_size=len(images))
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict(images, batch_size=len(images))
+        best = min(best, time.perf_counter() - start)
+    return outputs, best / len(images)
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    print('{:<12} {:>6} {:>7} {:>7} {:>10} {:>10} {:>9}'.format(
+        'model', 'batch', 'layers', 'folded', 'ms/image', 'folded', 'diff'))
+    for name, builder in [('resnet50', resnet50),
+                          ('densenet121', densenet121)]:
+        model = builder()
+        randomize_batch_norm(model)
+        folded = fold_batch_norm(model)
+        for batch_size in [1, 16]:
+            images = np.random.rand(batch_size, 224, 224, 3).astype(
+                np.float32)
+            expected, t = latency(model, images)
+            outputs, t_folded = latency(folded, images)
+            diff = np.abs(expected - outputs).max()
+            assert np.allclose(expected, outputs, atol=1e-5)
+            print('{:<12} {:>6} {:>7} {:>7} {:>10.2f} {:>10.2f} {:>9.1e}'
+                  .format(name, batch_size, len(model.layers),
+                          len(folded.layers), 1000 * t, 1000 * t_folded,
+                          diff))
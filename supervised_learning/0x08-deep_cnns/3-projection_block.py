@@ -37,24 +37,24 @@ def projection_block(A_prev, filters, s=2):
     lay1 = K.layers.Conv2D(kernel_size=(1, 1), filters=F11,
                            padding='same', strides=s,
                            kernel_initializer=kernel_init)(A_prev)
-    batch_norm1 = K.layers.BatchNormalization(axis=3)(lay1)
+    batch_norm1 = K.layers.BatchNormalization(axis=3, dtype='float32')(lay1)
     activation1 = K.layers.Activation('relu')(batch_norm1)
 
     lay2 = K.layers.Conv2D(kernel_size=(3, 3), filters=F3,
                            padding='same',
                            kernel_initializer=kernel_init)(activation1)
-    batch_norm2 = K.layers.BatchNormalization(axis=3)(lay2)
+    batch_norm2 = K.layers.BatchNormalization(axis=3, dtype='float32')(lay2)
     activation2 = K.layers.Activation('relu')(batch_norm2)
 
     lay3 = K.layers.Conv2D(kernel_size=(1, 1), filters=F12,
                            padding='same',
                            kernel_initializer=kernel_init)(activation2)
-    batch_norm3 = K.layers.BatchNormalization(axis=3)(lay3)
+    batch_norm3 = K.layers.BatchNormalization(axis=3, dtype='float32')(lay3)
 
     lay4 = K.layers.Conv2D(kernel_size=(1, 1), filters=F12,
                            padding='same', strides=s,
                            kernel_initializer=kernel_init)(A_prev)
-    batch_norm4 = K.layers.BatchNormalization(axis=3)(lay4)
+    batch_norm4 = K.layers.BatchNormalization(axis=3, dtype='float32')(lay4)
 
     add = K.layers.Add()([batch_norm3, batch_norm4])
     activation3 = K.layers.Activation('relu')(add)
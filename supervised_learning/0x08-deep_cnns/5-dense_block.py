@@ -3,10 +3,130 @@
 BUild a dense block as described in
 'Densely connected convolutional Networks'
 """
+import tensorflow as tf
 import tensorflow.keras as K
 
 
-def dense_block(X, nb_filters, growth_rate, layers):
+class DenseLayer(K.layers.Layer):
+    """
+    Bottleneck layer of a memory-efficient dense block: it takes the
+    feature maps of all the previous layers and, instead of storing
+    their concatenation and its batch normalization and ReLU for the
+    backward pass, recomputes them there
+
+    The batch statistics of the first batch normalization are computed
+    per feature map outside the recomputed function, so its moving
+    statistics are updated once per training step
+    """
+    def __init__(self, growth_rate, **kwargs):
+        """
+        growth_rate is the number of feature maps added by the layer
+        """
+        super().__init__(**kwargs)
+        self.growth_rate = growth_rate
+        kernel_init = K.initializers.he_normal(seed=None)
+        self.batch_norm1 = K.layers.BatchNormalization(dtype='float32',
+                                                       name='batch_norm1')
+        self.conv1 = K.layers.Conv2D(kernel_size=1, filters=4*growth_rate,
+                                     padding='same',
+                                     kernel_initializer=kernel_init,
+                                     name='conv1')
+        self.batch_norm2 = K.layers.BatchNormalization(dtype='float32',
+                                                       name='batch_norm2')
+        self.conv2 = K.layers.Conv2D(kernel_size=3, filters=growth_rate,
+                                     padding='same',
+                                     kernel_initializer=kernel_init,
+                                     name='conv2')
+
+    @staticmethod
+    def shapes(input_shape):
+        """
+        Returns the list of the shapes of the feature maps, from the
+        input shape of a list of them or of a single one
+        """
+        if not isinstance(input_shape[0], (list, tuple, tf.TensorShape)):
+            input_shape = [input_shape]
+        return [tf.TensorShape(shape).as_list() for shape in input_shape]
+
+    def build(self, input_shape):
+        """
+        Builds the sublayers, so that their weights exist before the
+        recomputed function uses them, each in its own name scope so
+        that their weight names stay distinct when the model is saved
+        """
+        shapes = self.shapes(input_shape)
+        shape = shapes[0]
+        shape[-1] = sum(s[-1] for s in shapes)
+        bottleneck = shape[:-1] + [4 * self.growth_rate]
+        for sublayer, sublayer_shape in ((self.batch_norm1, shape),
+                                         (self.conv1, shape),
+                                         (self.batch_norm2, bottleneck),
+                                         (self.conv2, bottleneck)):
+            with tf.name_scope(sublayer.name):
+                sublayer.build(sublayer_shape)
+        super().build(input_shape)
+
+    def call(self, features, training=None):
+        """
+        features is the list of the feature maps of the block so far
+
+        Returns:
+        the growth_rate new feature maps
+        """
+        if not isinstance(features, (list, tuple)):
+            features = [features]
+        norm = self.batch_norm1
+        moments = [tf.nn.moments(tf.cast(X, norm.dtype), axes=[0, 1, 2])
+                   for X in features]
+        batch_mean = tf.concat([mean for mean, _ in moments], axis=0)
+        batch_variance = tf.concat([var for _, var in moments], axis=0)
+        # like BatchNormalization, the moving variance is unbiased
+        n = tf.cast(tf.reduce_prod(tf.shape(features[0])[:3]), norm.dtype)
+        unbiased_variance = batch_variance * n / tf.maximum(n - 1, 1)
+
+        def update(variable, value):
+            """Moving average update of variable, in training only"""
+            return K.backend.in_train_phase(
+                lambda: K.backend.moving_average_update(
+                    variable, value, norm.momentum),
+                lambda: tf.identity(variable), training=training)
+
+        self.add_update([update(norm.moving_mean, batch_mean),
+                         update(norm.moving_variance, unbiased_variance)])
+        mean = K.backend.in_train_phase(batch_mean, norm.moving_mean,
+                                        training=training)
+        variance = K.backend.in_train_phase(
+            batch_variance, norm.moving_variance, training=training)
+
+        def bottleneck(mean, variance, *features):
+            """Concatenation, batch norm, ReLU and 1x1 convolution"""
+            X = tf.cast(tf.concat(features, axis=-1), norm.dtype)
+            X = tf.nn.batch_normalization(X, mean, variance, norm.beta,
+                                          norm.gamma, norm.epsilon)
+            return self.conv1(tf.nn.relu(X))
+
+        conv1 = tf.recompute_grad(bottleneck)(mean, variance, *features)
+        X = self.batch_norm2(conv1, training=training)
+        return self.conv2(tf.nn.relu(X))
+
+    def compute_output_shape(self, input_shape):
+        """
+        Returns the shape of the new feature maps
+        """
+        shape = self.shapes(input_shape)[0]
+        shape[-1] = self.growth_rate
+        return tf.TensorShape(shape)
+
+    def get_config(self):
+        """
+        Returns the config of the layer
+        """
+        config = super().get_config()
+        config['growth_rate'] = self.growth_rate
+        return config
+
+
+def dense_block(X, nb_filters, growth_rate, layers, memory_efficient=False):
     """
     BUilds a dense block as described in
     'Densely connected convolutional Networks'
@@ -16,6 +136,10 @@ def dense_block(X, nb_filters, growth_rate, layers):
     nb_filters is an integer representing the number of filters in X
     growth_rate is the growth rate for the dense block
     layers is the number of layers in the dense block
+    memory_efficient: if True, the layers keep only their own feature
+        maps and DenseLayer recomputes the concatenations in the
+        backward pass, so memory grows linearly instead of
+        quadratically with layers, at the cost of running them twice
 
     Requisites:
     You should use the bottleneck layers used for DenseNet-B
@@ -28,16 +152,23 @@ def dense_block(X, nb_filters, growth_rate, layers):
     the number of filters within the concatenated outputs, respectively
     """
 
+    if memory_efficient:
+        features = [X]
+        for lay in range(layers):
+            features.append(DenseLayer(growth_rate)(features))
+            nb_filters += growth_rate
+        return K.layers.concatenate(features), nb_filters
+
     kernel_init = K.initializers.he_normal(seed=None)
 
     for lay in range(layers):
-        batch_norm1 = K.layers.BatchNormalization()(X)
+        batch_norm1 = K.layers.BatchNormalization(dtype='float32')(X)
         activation1 = K.layers.Activation('relu')(batch_norm1)
         conv1 = K.layers.Conv2D(kernel_size=1, filters=4*growth_rate,
                                 padding='same',
                                 kernel_initializer=kernel_init)(activation1)
 
-        batch_norm2 = K.layers.BatchNormalization()(conv1)
+        batch_norm2 = K.layers.BatchNormalization(dtype='float32')(conv1)
         activation2 = K.layers.Activation('relu')(batch_norm2)
         conv2 = K.layers.Conv2D(kernel_size=3, filters=growth_rate,
                                 padding='same',
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 
+import numpy as np
+import os
 import tensorflow.keras as K
 dense_block = __import__('5-dense_block').dense_block
+DenseLayer = __import__('5-dense_block').DenseLayer
 
 if __name__ == '__main__':
     X = K.Input(shape=(56, 56, 64))
@@ -9,3 +12,13 @@ if __name__ == '__main__':
     model = K.models.Model(inputs=X, outputs=Y)
     model.summary()
     print(nb_filters)
+
+    X = K.Input(shape=(16, 16, 64))
+    Y, nb_filters = dense_block(X, 64, 32, 6, memory_efficient=True)
+    model = K.models.Model(inputs=X, outputs=Y)
+    model.save('5-dense_block.h5')
+    loaded = K.models.load_model('5-dense_block.h5',
+                                 custom_objects={'DenseLayer': DenseLayer})
+    os.remove('5-dense_block.h5')
+    X = np.random.randn(2, 16, 16, 64)
+    print(np.allclose(model.predict(X), loaded.predict(X), atol=1e-5))
@@ -28,7 +28,7 @@ def transition_layer(X, nb_filters, compression):
     kernel_init = K.initializers.he_normal(seed=None)
     filters = int(nb_filters * compression)
 
-    batch_norm = K.layers.BatchNormalization()(X)
+    batch_norm = K.layers.BatchNormalization(dtype='float32')(X)
     activation = K.layers.Activation('relu')(batch_norm)
     conv = K.layers.Conv2D(kernel_size=1, filters=filters,
                            padding='same',
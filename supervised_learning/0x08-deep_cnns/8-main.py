@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+
+densenet121 = __import__('7-densenet121').densenet121
+profile = __import__('8-profile')
+
+if __name__ == '__main__':
+    for growth_rate, compression in [(32, 0.5), (16, 0.5), (32, 1.0)]:
+        print('growth_rate={} compression={}'.format(growth_rate,
+                                                     compression))
+        model = densenet121(growth_rate, compression)
+        profile.print_profile(profile.profile_model(model, benchmark=True))
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Profile the parameters, compute and memory of the blocks of a Keras
+model built by the deep CNN builders
+"""
+import numpy as np
+import tensorflow.keras as K
+import time
+DenseLayer = __import__('5-dense_block').DenseLayer
+
+MERGE_LAYERS = (K.layers.Add, K.layers.Concatenate)
+POOL_LAYERS = (K.layers.MaxPooling2D, K.layers.AveragePooling2D)
+
+
+def inbound_layers(layer):
+    """
+    Returns the list of layers whose outputs are the inputs of layer in
+    the model it was built for, its first call
+    """
+    if not layer._inbound_nodes:
+        return []
+    inbound = layer._inbound_nodes[0].inbound_layers
+    if not isinstance(inbound, (list, tuple)):
+        inbound = [inbound]
+    return list(inbound)
+
+
+def call_inputs(layer, tensors):
+    """
+    Returns the inputs to call layer again with, in the structure of its
+    first call, tensors mapping the id of each layer feeding it to the
+    new tensor standing for its output
+    """
+    node = layer._inbound_nodes[0]
+    inbound = node.inbound_layers
+    if not isinstance(inbound, (list, tuple)):
+        return tensors[id(inbound)]
+    if len(inbound) == 1 and not hasattr(node, 'call_args'):
+        # the Keras of TF 1.x keeps no call structure and unwraps single
+        # inputs itself when it runs a model
+        return tensors[id(inbound[0])]
+    return [tensors[id(layer)] for layer in inbound]
+
+
+def layer_macs(layer):
+    """
+    Returns the number of multiply-accumulates of layer for one example
+    """
+    out_shape = K.backend.int_shape(layer.output)
+    if isinstance(layer, DenseLayer):
+        inputs = layer.input
+        if not isinstance(inputs, (list, tuple)):
+            inputs = [inputs]
+        pixels = int(np.prod(out_shape[1:-1]))
+        c_prev = sum(K.backend.int_shape(X)[-1] for X in inputs)
+        macs = 0
+        for conv in (layer.conv1, layer.conv2):
+            kh, kw = conv.kernel_size
+            macs += pixels * kh * kw * c_prev * conv.filters
+            c_prev = conv.filters
+        return macs
+    if isinstance(layer, K.layers.Conv2D):
+        kh, kw = layer.kernel_size
+        c_prev = K.backend.int_shape(layer.input)[-1]
+        return int(np.prod(out_shape[1:])) * kh * kw * c_prev
+    if isinstance(layer, K.layers.Dense):
+        c_prev = K.backend.int_shape(layer.input)[-1]
+        return int(np.prod(out_shape[1:])) * c_prev
+    return 0
+
+
+def split_blocks(layers):
+    """
+    Splits the layers of a model into blocks: a block ends with a merge
+    layer (Add or Concatenate) and the activations right after it, with
+    a strided pooling layer, or with the last layer
+    """
+    blocks = [[]]
+    merged = False
+    for layer in layers:
+        if isinstance(layer, K.layers.InputLayer):
+            continue
+        activation = isinstance(layer, K.layers.Activation)
+        if merged and not activation:
+            blocks.append([])
+        blocks[-1].append(layer)
+        merged = (isinstance(layer, MERGE_LAYERS) or
+                  (merged and activation))
+        if isinstance(layer, POOL_LAYERS) and max(layer.strides) > 1:
+            blocks.append([])
+            merged = False
+    return [block for block in blocks if block]
+
+
+def time_block(block, inputs, batch_size, repeat):
+    """
+    Returns the best CPU time of a forward pass through block, in
+    seconds, by calling its layers again on new inputs
+    """
+    tensors = {id(layer): K.Input(shape=K.backend.int_shape(
+        layer.output)[1:]) for layer in inputs}
+    sub_inputs = [tensors[id(layer)] for layer in inputs]
+    for layer in block:
+        tensors[id(layer)] = layer(call_inputs(layer, tensors))
+    sub = K.models.Model(inputs=sub_inputs, outputs=tensors[id(block[-1])])
+    feed = [np.random.randn(batch_size, *K.backend.int_shape(x)[1:])
+            for x in sub_inputs]
+    sub.predict(feed, batch_size=batch_size)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sub.predict(feed, batch_size=batch_size)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def profile_model(model, batch_size=1, benchmark=False, repeat=10,
+                  dominant_share=0.5):
+    """
+    Profiles a Keras model block by block
+
+    Arguments:
+    model is the Keras model, e.g. from inception_network, resnet50 or
+        densenet121
+    batch_size is the batch size used for memory and timings
+    benchmark: if True, every block is timed on the CPU
+    repeat is the number of timed forward passes per block
+    dominant_share is the share of the total MACs the dominant blocks
+        account for
+
+    Returns:
+    a dict with:
+        blocks: a list with a dict per block of its name, layers,
+            params, macs, activation_bytes (all outputs of the block),
+            peak_bytes (the most memory held by live tensors while the
+            block runs), seconds (None without benchmark) and dominant
+            (True for the fewest blocks, taken by decreasing MACs, that
+            account for dominant_share of the total MACs)
+        params, macs and peak_bytes for the whole model
+    """
+    layers = model.layers
+    index = {id(layer): i for i, layer in enumerate(layers)}
+    last_use = list(range(len(layers)))
+    for i, layer in enumerate(layers):
+        for inbound in inbound_layers(layer):
+            last_use[index[id(inbound)]] = i
+    for output in model.outputs:
+        for i, layer in enumerate(layers):
+            if layer.output is output:
+                last_use[i] = len(layers)
+
+    sizes = []
+    for layer in layers:
+        itemsize = np.dtype(K.backend.dtype(layer.output)).itemsize
+        sizes.append(batch_size * itemsize *
+                     int(np.prod(K.backend.int_shape(layer.output)[1:])))
+    live = []
+    for i in range(len(layers)):
+        live.append(sum(sizes[j] for j in range(i + 1) if last_use[j] >= i))
+
+    blocks = []
+    for block in split_blocks(layers):
+        ids = {id(layer) for layer in block}
+        steps = [index[id(layer)] for layer in block]
+        inputs = []
+        for layer in block:
+            for inbound in inbound_layers(layer):
+                if id(inbound) not in ids and inbound not in inputs:
+                    inputs.append(inbound)
+        blocks.append({
+            'name': '{} ({})'.format(len(blocks), block[-1].name),
+            'layers': len(block),
+            'params': sum(layer.count_params() for layer in block),
+            'macs': sum(layer_macs(layer) for layer in block),
+            'activation_bytes': sum(sizes[i] for i in steps),
+            'peak_bytes': max(live[i] for i in steps),
+            'seconds': (time_block(block, inputs, batch_size, repeat)
+                        if benchmark else None)})
+
+    macs = sum(block['macs'] for block in blocks)
+    covered = 0
+    for block in sorted(blocks, key=lambda block: -block['macs']):
+        block['dominant'] = covered < dominant_share * macs
+        covered += block['macs']
+
+    return {'blocks': blocks, 'params': model.count_params(),
+            'macs': macs, 'peak_bytes': max(live)}
+
+
+def print_profile(profile):
+    """
+    Prints a profile returned by profile_model as a table, marking the
+    dominant blocks with a *
+    """
+    print('{:<32} {:>6} {:>11} {:>8} {:>10} {:>10} {:>9}'.format(
+        'block', 'layers', 'params', 'GMACs', 'act MB', 'peak MB', 'ms'))
+    for block in profile['blocks']:
+        ms = '-' if block['seconds'] is None else '{:.2f}'.format(
+            1000 * block['seconds'])
+        print('{:<32} {:>6} {:>11,} {:>8.3f} {:>10.1f} {:>10.1f} {:>9}{}'
+              .format(block['name'][:32], block['layers'], block['params'],
+                      block['macs'] / 1e9, block['activation_bytes'] / 2**20,
+                      block['peak_bytes'] / 2**20, ms,
+                      ' *' if block['dominant'] else ''))
+    print('total: {:,} params, {:.3f} GMACs, {:.1f} MB peak'.format(
+        profile['params'], profile['macs'] / 1e9,
+        profile['peak_bytes'] / 2**20))
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Precision policies for the deep CNN builders
+"""
+import contextlib
+import tensorflow.keras as K
+
+POLICIES = {'float32': 'float32',
+            'float16': 'mixed_float16',
+            'bfloat16': 'mixed_bfloat16'}
+
+
+@contextlib.contextmanager
+def precision_policy(precision='float32'):
+    """
+    Context manager building the layers created inside it with the
+    Keras policy of precision, then restoring the previous policy
+
+    Arguments:
+    precision is 'float32', or 'float16' or 'bfloat16' for mixed
+        precision: layers compute in that type but keep float32
+        weights; the builders keep BatchNormalization and the softmax
+        output in float32
+
+    float32 leaves the policy alone, so it also works with the Keras of
+    TensorFlow 1.x, which has no mixed precision policies
+    """
+    if precision not in POLICIES:
+        raise ValueError('precision must be one of {}'.format(
+            ', '.join(POLICIES)))
+    if precision == 'float32':
+        yield
+        return
+    mixed_precision = getattr(K, 'mixed_precision', None)
+    if not hasattr(mixed_precision, 'set_global_policy'):
+        raise ValueError('precision {} needs the mixed precision API of '
+                         'TensorFlow 2.4 or later'.format(precision))
+    previous = mixed_precision.global_policy()
+    mixed_precision.set_global_policy(POLICIES[precision])
+    try:
+        yield
+    finally:
+        mixed_precision.set_global_policy(previous)
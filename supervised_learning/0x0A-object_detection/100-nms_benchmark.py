@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark the non-max suppression of the Yolo class against the
+original loop implementation, from 100 to 50k candidate boxes
+"""
+import numpy as np
+import time
+Yolo = __import__('7-yolo').Yolo
+
+
+def loop_nms(filtered_boxes, box_classes, box_scores, nms_t):
+    """
+    Reference non-max suppression with a scalar double loop per class
+    """
+    idx = np.lexsort((-box_scores, box_classes))
+    box_pred = filtered_boxes[idx]
+    pred_classes = box_classes[idx]
+    pred_scores = box_scores[idx]
+
+    _, class_counts = np.unique(pred_classes, return_counts=True)
+
+    i = 0
+    accum = 0
+
+    for class_count in class_counts:
+        while i < accum + class_count:
+            j = i + 1
+            while j < accum + class_count:
+                box1 = box_pred[i]
+                box2 = box_pred[j]
+                xi1 = max(box1[0], box2[0])
+                yi1 = max(box1[1], box2[1])
+                xi2 = min(box1[2], box2[2])
+                yi2 = min(box1[3], box2[3])
+                inter_area = max(yi2 - yi1, 0) * max(xi2 - xi1, 0)
+
+                box1_area = (box1[3] - box1[1]) * (box1[2] - box1[0])
+                box2_area = (box2[3] - box2[1]) * (box2[2] - box2[0])
+                union_area = box1_area + box2_area - inter_area
+
+                iou = inter_area / union_area
+
+                if iou > nms_t:
+                    box_pred = np.delete(box_pred, j, axis=0)
+                    pred_scores = np.delete(pred_scores, j, axis=0)
+                    pred_classes = np.delete(pred_classes, j, axis=0)
+                    class_count -= 1
+                else:
+                    j += 1
+            i += 1
+        accum += class_count
+
+    return box_pred, pred_classes, pred_scores
+
+
+def random_candidates(n, classes=80, size=416):
+    """
+    Creates n random boxes with classes and scores, some of them over
+    the top or left edge of the image
+    """
+    xy = np.random.uniform(-size / 8, size, (n, 2))
+    wh = np.random.uniform(10, size / 4, (n, 2))
+    boxes = np.concatenate((xy, xy + wh), axis=1)
+    box_classes = np.random.randint(0, classes, n)
+    box_scores = np.random.uniform(0.6, 1, n)
+    return boxes, box_classes, box_scores
+
+
+def edge_candidates():
+    """
+    Boxes over the top left corner of the image, where a class 0 box
+    shifted by the class offset could suppress a box of class 1
+    """
+    boxes = np.array([[0, 0, 10, 10], [-10, -10, 0, 0], [-9, -9, 1, 1]],
+                     dtype=float)
+    return boxes, np.array([0, 1, 1]), np.array([0.9, 0.8, 0.7])
+
+
+def timeit(f, *args, **kwargs):
+    """
+    Returns the output and the running time of f in seconds
+    """
+    start = time.perf_counter()
+    out = f(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    yolo = Yolo.__new__(Yolo)
+    yolo.nms_t = 0.5
+
+    edge = edge_candidates()
+    assert all(np.array_equal(a, b) for a, b in zip(
+        yolo.non_max_suppression(*edge),
+        yolo.non_max_suppression(*edge, batched=True)))
+
+    print('{:>7} {:>10} {:>10} {:>10}'.format(
+        'boxes', 'loop', 'per-class', 'batched'))
+    for n in [100, 500, 1000, 2000, 5000, 10000, 20000, 50000]:
+        candidates = random_candidates(n)
+        new, t_new = timeit(yolo.non_max_suppression, *candidates)
+        t_loop = t_bat = float('nan')
+        if n <= 5000:
+            bat, t_bat = timeit(yolo.non_max_suppression, *candidates,
+                                batched=True)
+            assert all(np.array_equal(a, b) for a, b in zip(new, bat))
+        if n <= 2000:
+            old, t_loop = timeit(loop_nms, *candidates, yolo.nms_t)
+            assert all(np.array_equal(a, b) for a, b in zip(old, new))
+        print('{:>7} {:>10.4f} {:>10.4f} {:>10.4f}'.format(
+            n, t_loop, t_new, t_bat))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Yolo decode and resize stage in images per second
+against the number of workers, for thread and process pools
+"""
+import cv2
+import numpy as np
+import os
+import tempfile
+import time
+from itertools import repeat
+Yolo = __import__('7-yolo').Yolo
+
+
+def write_images(folder, n, shape=(480, 640, 3)):
+    """
+    Writes n random jpg images of a given shape to folder
+    """
+    paths = []
+    for i in range(n):
+        path = os.path.join(folder, '{}.jpg'.format(i))
+        cv2.imwrite(path, np.random.randint(0, 256, shape, dtype=np.uint8))
+        paths.append(path)
+    return paths
+
+
+def images_per_second(paths, dim, workers, executor):
+    """
+    Reads and resizes all paths with a pool of workers
+    """
+    start = time.perf_counter()
+    with Yolo.make_executor(workers, executor) as pool:
+        list(pool.map(Yolo.read_resize_image, paths, repeat(dim)))
+    return len(paths) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    dim = (416, 416)
+    with tempfile.TemporaryDirectory() as folder:
+        paths = write_images(folder, 200)
+
+        start = time.perf_counter()
+        for path in paths:
+            Yolo.read_resize_image(path, dim)
+        serial = len(paths) / (time.perf_counter() - start)
+        print('serial: {:.1f} images/s'.format(serial))
+
+        print('{:>7} {:>10} {:>10}'.format('workers', 'thread', 'process'))
+        workers = 1
+        while workers <= os.cpu_count():
+            print('{:>7} {:>10.1f} {:>10.1f}'.format(
+                workers,
+                images_per_second(paths, dim, workers, 'thread'),
+                images_per_second(paths, dim, workers, 'process')))
+            workers *= 2
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark each stage of the Yolo pipeline with a fake Darknet model,
+so it runs without weights, and print the timings as JSON
+"""
+import argparse
+import cv2
+import json
+import numpy as np
+import os
+import tempfile
+import time
+Yolo = __import__('7-yolo').Yolo
+
+
+class Shape():
+    """
+    Stands for a Keras tensor, only exposing its shape
+    """
+    def __init__(self, *shape):
+        """
+        shape: the shape of the tensor
+        """
+        self.shape = shape
+
+
+class FakeDarknet():
+    """
+    Fake Darknet model returning synthetic outputs of the right shape
+    """
+    def __init__(self, classes=80, candidates=100, input_size=416,
+                 anchor_boxes=3):
+        """
+        classes: the number of classes predicted
+        candidates: the number of anchors per image with a high box
+            confidence, and therefore the size of the filter output
+        input_size: the input height and width of the model
+        anchor_boxes: the number of anchor boxes per output
+        """
+        self.classes = classes
+        self.candidates = candidates
+        self.input = Shape(None, input_size, input_size, 3)
+        self.outputs = [Shape(None, input_size // s, input_size // s,
+                              anchor_boxes, 5 + classes)
+                        for s in (32, 16, 8)]
+
+    def predict(self, pimages):
+        """
+        Returns random outputs where candidates anchors per image have a
+            high box confidence and a likely class
+        """
+        ni = pimages.shape[0]
+        outputs = [np.random.randn(ni, *out.shape[1:]) for out in
+                   self.outputs]
+        sizes = [np.prod(out.shape[1:4]) for out in self.outputs]
+        for output in outputs:
+            output[..., 4] = -10
+        for i in range(ni):
+            picked = np.random.choice(sum(sizes), self.candidates,
+                                      replace=False)
+            scale = np.searchsorted(np.cumsum(sizes), picked, side='right')
+            for j, output in enumerate(outputs):
+                flat = output[i].reshape(-1, 5 + self.classes)
+                anchors = picked[scale == j] - sum(sizes[:j])
+                flat[anchors, 4] = 10
+                flat[anchors, 5 + np.random.randint(self.classes,
+                                                    size=len(anchors))] = 10
+        return outputs
+
+
+def timeit(f, *args, repeat=3, **kwargs):
+    """
+    Returns the output of f and its best running time in seconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = f(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def benchmark(folder, images, classes, candidates):
+    """
+    Times each stage of the pipeline for one configuration
+    """
+    classes_path = os.path.join(folder, 'classes.txt')
+    with open(classes_path, 'w') as f:
+        f.write('\n'.join('class{}'.format(c) for c in range(classes)))
+    anchors = np.array([[[116, 90], [156, 198], [373, 326]],
+                        [[30, 61], [62, 45], [59, 119]],
+                        [[10, 13], [16, 30], [33, 23]]])
+    yolo = Yolo(None, classes_path, 0.6, 0.5, anchors, lazy=True)
+    yolo.model = FakeDarknet(classes, candidates)
+
+    image_folder = os.path.join(folder, 'images{}'.format(images))
+    if not os.path.isdir(image_folder):
+        os.makedirs(image_folder)
+        for i in range(images):
+            cv2.imwrite(os.path.join(image_folder, '{}.jpg'.format(i)),
+                        np.random.randint(0, 256, (480, 640, 3),
+                                          dtype=np.uint8))
+
+    times = {}
+    (loaded, _), times['load_images'] = timeit(yolo.load_images,
+                                               image_folder)
+    (pimages, image_shapes), times['preprocess_images'] = timeit(
+        yolo.preprocess_images, loaded)
+    _, times['preprocess_images_float32'] = timeit(
+        yolo.preprocess_images, loaded, dtype=np.float32)
+    np.random.seed(0)
+    outputs, times['predict'] = timeit(yolo.model.predict, pimages)
+
+    def process_all():
+        """Runs process_outputs on each image"""
+        return [yolo.process_outputs([out[i].copy() for out in outputs],
+                                     image_shapes[i]) for i in range(images)]
+
+    processed, times['process_outputs'] = timeit(process_all)
+    filtered, times['filter_boxes'] = timeit(
+        lambda: [yolo.filter_boxes(*p) for p in processed])
+    results, times['non_max_suppression'] = timeit(
+        lambda: [yolo.non_max_suppression(*f) for f in filtered])
+    _, times['postprocess_batch'] = timeit(yolo.postprocess_batch, outputs,
+                                           image_shapes)
+    _, times['end_to_end'] = timeit(yolo.predict, image_folder,
+                                    headless=True, folder=None)
+
+    return {'images': images, 'classes': classes, 'candidates': candidates,
+            'boxes': int(sum(len(r[0]) for r in results)),
+            'seconds': times}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--classes', type=int, nargs='+', default=[20, 80])
+    parser.add_argument('--candidates', type=int, nargs='+',
+                        default=[10, 100, 1000])
+    parser.add_argument('--output', help='JSON file, stdout by default')
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    runs = []
+    with tempfile.TemporaryDirectory() as folder:
+        for images in args.images:
+            for classes in args.classes:
+                for candidates in args.candidates:
+                    runs.append(benchmark(folder, images, classes,
+                                          candidates))
+
+    report = json.dumps({'benchmark': 'yolo', 'runs': runs}, indent=2)
+    if args.output is None:
+        print(report)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
@@ -2,18 +2,25 @@
 """
 Write a class Yolo that uses the Yolo v3 algorithm to perform object detection
 """
-import tensorflow.keras as K
 import numpy as np
 import cv2
 import glob
+import json
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
+from itertools import islice, repeat
 
 
 class Yolo():
     """
     Class Yolo that uses the Yolo v3 algorithm to perform object detection
     """
-    def __init__(self, model_path, classes_path, class_t, nms_t, anchors):
+    def __init__(self, model_path, classes_path, class_t, nms_t, anchors,
+                 top_k=None, lazy=False, metadata_path=None):
         """
         class constructor:
             model_path is the path to where a Darknet Keras model is stored
@@ -30,19 +37,106 @@ class Yolo():
                 anchor_boxes is the number of anchor boxes used
                     for each prediction
                 2 => [anchor_box_width, anchor_box_height]
+            top_k is the maximum number of boxes kept per image by the
+                filtering step, None to keep all of them
+            lazy: if True, TensorFlow and the model are only loaded the
+                first time the model is used
+            metadata_path is the path of a JSON cache of the model input
+                size and output grid sizes; it is read if it exists,
+                otherwise written once the model is loaded, so that a
+                lazy instance knows them without loading the model
         Public instance attributes:
-            model: the Darknet Keras model
+            model: the Darknet Keras model, loaded on first access
+            model_path: the path the model is loaded from
+            metadata_path: the path of the model metadata cache
+            input_w, input_h: the input size of the Darknet model
+            grid_shapes: the (grid_height, grid_width) of each output
             class_names: a list of the class names for the model
             class_t: the box score threshold for the initial filtering step
             nms_t: the IOU threshold for non-max suppression
             anchors: the anchor boxes
+            top_k: the maximum number of filtered boxes per image
+            buffer: the preallocated input batch reused by
+                preprocess_images when a dtype is given
         """
-        self.model = K.models.load_model(model_path)
+        self.model_path = model_path
+        self.metadata_path = metadata_path
+        self.__model = None
+        self.__metadata = None
+        if metadata_path is not None and os.path.exists(metadata_path):
+            with open(metadata_path, 'r') as f:
+                self.__metadata = json.load(f)
+        if not lazy:
+            self.model
         with open(classes_path, 'r') as f:
             self.class_names = [line.strip() for line in f]
         self.class_t = class_t
         self.nms_t = nms_t
         self.anchors = anchors
+        self.top_k = top_k
+        self.buffer = None
+
+    @property
+    def model(self):
+        """
+        Getter for the Darknet Keras model, loaded on first access
+        """
+        if self.__model is None:
+            import tensorflow.keras as K
+            self.model = K.models.load_model(self.model_path)
+        return self.__model
+
+    @model.setter
+    def model(self, model):
+        """
+        Sets the model and caches its input and output grid sizes
+        """
+        self.__model = model
+        self.__metadata = self.model_metadata(model)
+        if self.metadata_path is not None:
+            with open(self.metadata_path, 'w') as f:
+                json.dump(self.__metadata, f)
+
+    @staticmethod
+    def model_metadata(model):
+        """
+        Returns a dict of the input size and output grid sizes of model
+        """
+        return {'input_w': int(model.input.shape[1]),
+                'input_h': int(model.input.shape[2]),
+                'grid_shapes': [[int(output.shape[1]), int(output.shape[2])]
+                                for output in model.outputs]}
+
+    @property
+    def metadata(self):
+        """
+        Getter for the cached model metadata, loading the model if it
+            was not read from metadata_path
+        """
+        if self.__metadata is None:
+            self.model
+        return self.__metadata
+
+    @property
+    def input_w(self):
+        """
+        Getter for the model input width
+        """
+        return self.metadata['input_w']
+
+    @property
+    def input_h(self):
+        """
+        Getter for the model input height
+        """
+        return self.metadata['input_h']
+
+    @property
+    def grid_shapes(self):
+        """
+        Getter for the (grid_height, grid_width) of each model output
+        """
+        return [tuple(shape) for shape in self.metadata['grid_shapes']]
 
     def sigmoid(self, z):
         """
@@ -115,8 +209,8 @@ class Yolo():
             theight = (box[..., 3])
             pw = self.anchors[i, :, 0]
             ph = self.anchors[i, :, 1]
-            bw = (pw * np.exp(twidth)) / self.model.input.shape[1].value
-            bh = (ph * np.exp(theight)) / self.model.input.shape[2].value
+            bw = (pw * np.exp(twidth)) / self.input_w
+            bh = (ph * np.exp(theight)) / self.input_h
 
             x1 = bx - bw / 2
             y1 = by - bh / 2
@@ -130,6 +224,72 @@ class Yolo():
 
         return boxes, box_confidences, box_class_probs
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def grid_offsets(grid_height, grid_width):
+        """
+        Grid cell offsets for an output of a given grid size, cached
+        so they are only built once per (grid_height, grid_width)
+        Returns:
+            Tuple of (Cx, Cy):
+            Cx: a read-only numpy.ndarray of shape (1, grid_width, 1)
+            Cy: a read-only numpy.ndarray of shape (grid_height, 1, 1)
+        """
+        Cx = np.arange(grid_width).reshape(1, grid_width, 1)
+        Cy = np.arange(grid_height).reshape(grid_height, 1, 1)
+        Cx.setflags(write=False)
+        Cy.setflags(write=False)
+        return Cx, Cy
+
+    def process_outputs_batch(self, outputs, image_sizes):
+        """
+        Process the outputs for a batch of images in one pass.
+
+        Arguments:
+        outputs: list of numpy.ndarrays containing the predictions
+                from the Darknet model for ni images:
+            Each output will have the shape (ni, grid_height, grid_width,
+                    anchor_boxes, 4 + 1 + classes)
+        image_sizes: numpy.ndarray of shape (ni, 2) containing the
+            images' original sizes [image_height, image_width]
+        Returns:
+        tuple of (boxes, box_confidences, box_class_probs), the same as
+            process_outputs with an extra leading axis of size ni
+        """
+        image_sizes = np.asarray(image_sizes, dtype=float)
+        img_height = image_sizes[:, 0].reshape(-1, 1, 1, 1)
+        img_width = image_sizes[:, 1].reshape(-1, 1, 1, 1)
+        input_width = self.input_w
+        input_height = self.input_h
+        boxes = []
+        box_confidences = []
+        box_class_probs = []
+
+        for i, output in enumerate(outputs):
+            _, grid_height, grid_width, _, _ = output.shape
+            Cx, Cy = self.grid_offsets(grid_height, grid_width)
+
+            bx = (self.sigmoid(output[..., 0]) + Cx) / grid_width
+            by = (self.sigmoid(output[..., 1]) + Cy) / grid_height
+            bw = (self.anchors[i, :, 0] * np.exp(output[..., 2])) / \
+                input_width
+            bh = (self.anchors[i, :, 1] * np.exp(output[..., 3])) / \
+                input_height
+
+            box = np.empty(output.shape[:-1] + (4,))
+            x1 = bx - bw / 2
+            y1 = by - bh / 2
+            box[..., 0] = x1 * img_width
+            box[..., 1] = y1 * img_height
+            box[..., 2] = (x1 + bw) * img_width
+            box[..., 3] = (y1 + bh) * img_height
+
+            boxes.append(box)
+            box_confidences.append(self.sigmoid(output[..., 4, np.newaxis]))
+            box_class_probs.append(self.sigmoid(output[..., 5:]))
+
+        return boxes, box_confidences, box_class_probs
+
     def filter_boxes(self, boxes, box_confidences, box_class_probs):
         """
         Arguments:
@@ -152,29 +312,99 @@ class Yolo():
             box_scores: a numpy.ndarray of shape (?) containing the box
                 scores for each box in filtered_boxes, respectively
         """
+        filtered = [self.filter_scale(box[np.newaxis], conf[np.newaxis],
+                                      prob[np.newaxis])
+                    for box, conf, prob in
+                    zip(boxes, box_confidences, box_class_probs)]
+        filtered_boxes = np.concatenate([f[1] for f in filtered])
+        box_classes = np.concatenate([f[2] for f in filtered])
+        box_scores = np.concatenate([f[3] for f in filtered])
 
-        scores = []
-        for box_conf, box_class_prob in zip(box_confidences, box_class_probs):
-            scores.append(box_conf * box_class_prob)
+        keep = self.top_k_indices(box_scores)
+        if keep is not None:
+            filtered_boxes = filtered_boxes[keep]
+            box_classes = box_classes[keep]
+            box_scores = box_scores[keep]
 
-        scores_list = [score.max(axis=-1) for score in scores]
-        scores_list = [score.reshape(-1) for score in scores_list]
-        box_scores = np.concatenate(scores_list)
-        del_idx = np.where(box_scores < self.class_t)
-        box_scores = np.delete(box_scores, del_idx)
+        return filtered_boxes, box_classes, box_scores
 
-        classes_list = [box.argmax(axis=3) for box in scores]
-        classes_list = [box.reshape(-1) for box in classes_list]
-        box_classes = np.concatenate(classes_list)
-        box_classes = np.delete(box_classes, del_idx)
+    def filter_boxes_batch(self, boxes, box_confidences, box_class_probs):
+        """
+        Filters the boxes of a batch of images in one pass.
 
-        box_list = [box.reshape(-1, 4) for box in boxes]
-        boxes = np.concatenate(box_list, axis=0)
-        filtered_boxes = np.delete(boxes, del_idx, axis=0)
+        Arguments:
+        boxes, box_confidences, box_class_probs: the outputs of
+            process_outputs_batch, each with a leading axis of size ni
+        Return:
+            a list of ni tuples of (filtered_boxes, box_classes,
+                box_scores), the same as filter_boxes for each image
+        """
+        ni = boxes[0].shape[0]
+        filtered = [self.filter_scale(box, conf, prob) for box, conf, prob in
+                    zip(boxes, box_confidences, box_class_probs)]
+        images = np.concatenate([f[0] for f in filtered])
+        order = np.argsort(images, kind='stable')
+        splits = np.searchsorted(images[order], np.arange(1, ni))
+        per_image = [np.split(np.concatenate([f[j] for f in filtered])[order],
+                              splits) for j in range(1, 4)]
 
-        return filtered_boxes, box_classes, box_scores
+        results = []
+        for filtered_boxes, box_classes, box_scores in zip(*per_image):
+            keep = self.top_k_indices(box_scores)
+            if keep is not None:
+                filtered_boxes = filtered_boxes[keep]
+                box_classes = box_classes[keep]
+                box_scores = box_scores[keep]
+            results.append((filtered_boxes, box_classes, box_scores))
 
-    def non_max_suppression(self, filtered_boxes, box_classes, box_scores):
+        return results
+
+    def filter_scale(self, boxes, box_confidences, box_class_probs):
+        """
+        Filters the boxes of one output scale for ni images. Boxes whose
+        confidence is below class_t are dropped before the class
+        probabilities are multiplied in, since their score (confidence
+        times a probability of at most 1) cannot reach class_t.
+
+        Arguments:
+        boxes: a numpy.ndarray of shape (ni, grid_height, grid_width,
+            anchor_boxes, 4)
+        box_confidences: a numpy.ndarray of shape (ni, grid_height,
+            grid_width, anchor_boxes, 1)
+        box_class_probs: a numpy.ndarray of shape (ni, grid_height,
+            grid_width, anchor_boxes, classes)
+        Return:
+            Tuple of (images, filtered_boxes, box_classes, box_scores):
+            images: the index of the image of each filtered box
+            filtered_boxes, box_classes, box_scores: as in filter_boxes
+        """
+        ni = boxes.shape[0]
+        conf = box_confidences.reshape(ni, -1)
+        images, anchors = np.nonzero(conf >= self.class_t)
+
+        probs = box_class_probs.reshape(ni, conf.shape[1], -1)
+        scores = conf[images, anchors, np.newaxis] * probs[images, anchors]
+        box_scores = scores.max(axis=-1)
+        box_classes = scores.argmax(axis=-1)
+
+        keep = np.flatnonzero(box_scores >= self.class_t)
+        anchors = anchors[keep]
+        images = images[keep]
+        filtered_boxes = boxes.reshape(ni, -1, 4)[images, anchors]
+
+        return images, filtered_boxes, box_classes[keep], box_scores[keep]
+
+    def top_k_indices(self, box_scores):
+        """
+        Returns the sorted indices of the top_k highest box_scores, or
+            None if there are no more than top_k boxes
+        """
+        if self.top_k is None or box_scores.shape[0] <= self.top_k:
+            return None
+        return np.sort(np.argpartition(-box_scores, self.top_k)[:self.top_k])
+
+    def non_max_suppression(self, filtered_boxes, box_classes, box_scores,
+                            batched=False):
         """
         filtered_boxes: a numpy.ndarray of shape (?, 4) containing all of
             the filtered bounding boxes:
@@ -182,6 +412,11 @@ class Yolo():
             number for the class that filtered_boxes predicts, respectively
         box_scores: a numpy.ndarray of shape (?) containing the box scores
             for each box in filtered_boxes, respectively
+        batched: if True, boxes are moved to non-negative coordinates and
+            shifted by a per-class stride wider than their range, so that
+            boxes of different classes never overlap, and all classes are
+            suppressed in a single pass; this is faster for small inputs
+            with many classes, but compares every pair of boxes
         Return:
             Tuple of (box_predictions, predicted_box_classes,
                 predicted_box_scores):
@@ -193,49 +428,80 @@ class Yolo():
             predicted_box_scores: a numpy.ndarray of shape (?) containing
                 the box scores for box_predictions ordered by class and
                 box score, respectively
+        """
+        idx = np.lexsort((-box_scores, box_classes))
+        box_pred = filtered_boxes[idx]
+        pred_classes = box_classes[idx]
+        pred_scores = box_scores[idx]
 
+        if batched:
+            low = box_pred.min(initial=0)
+            stride = box_pred.max(initial=0) - low + 1
+            offsets = pred_classes * stride - low
+            keep = self.nms_keep(box_pred + offsets[:, np.newaxis])
+        else:
+            keep = np.zeros(pred_classes.shape[0], dtype=bool)
+            _, starts = np.unique(pred_classes, return_index=True)
+            stops = np.append(starts[1:], pred_classes.shape[0])
+            for start, stop in zip(starts, stops):
+                keep[start:stop] = self.nms_keep(box_pred[start:stop])
+
+        return box_pred[keep], pred_classes[keep], pred_scores[keep]
+
+    @staticmethod
+    def iou(box, boxes):
         """
+        Calculates the intersection over union between boxes
+        Arguments:
+        box: a numpy.ndarray of shape (..., 4) containing boxes as
+            (x1, y1, x2, y2)
+        boxes: a numpy.ndarray of shape (..., 4) broadcastable against box
+        Returns:
+            a numpy.ndarray with the broadcast shape of box and boxes
+                (without the last axis) containing the IoU of each pair
+        """
+        xi1 = np.maximum(box[..., 0], boxes[..., 0])
+        yi1 = np.maximum(box[..., 1], boxes[..., 1])
+        xi2 = np.minimum(box[..., 2], boxes[..., 2])
+        yi2 = np.minimum(box[..., 3], boxes[..., 3])
+        inter_area = np.maximum(yi2 - yi1, 0) * np.maximum(xi2 - xi1, 0)
 
-        idx = np.lexsort((-box_scores, box_classes))
-        box_pred = np.array([filtered_boxes[i] for i in idx])
-        pred_classes = np.array([box_classes[i] for i in idx])
-        pred_scores = np.array([box_scores[i] for i in idx])
-
-        _, class_counts = np.unique(pred_classes, return_counts=True)
-
-        i = 0
-        accum = 0
-
-        for class_count in class_counts:
-            while i < accum + class_count:
-                j = i + 1
-                while j < accum + class_count:
-
-                    box1 = box_pred[i]
-                    box2 = box_pred[j]
-                    xi1 = max(box1[0], box2[0])
-                    yi1 = max(box1[1], box2[1])
-                    xi2 = min(box1[2], box2[2])
-                    yi2 = min(box1[3], box2[3])
-                    inter_area = max(yi2 - yi1, 0) * max(xi2 - xi1, 0)
-
-                    box1_area = (box1[3] - box1[1]) * (box1[2] - box1[0])
-                    box2_area = (box2[3] - box2[1]) * (box2[2] - box2[0])
-                    union_area = box1_area + box2_area - inter_area
-
-                    iou = inter_area / union_area
-
-                    if iou > self.nms_t:
-                        box_pred = np.delete(box_pred, j, axis=0)
-                        pred_scores = np.delete(pred_scores, j, axis=0)
-                        pred_classes = (np.delete(pred_classes, j, axis=0))
-                        class_count -= 1
-                    else:
-                        j += 1
-                i += 1
-            accum += class_count
-
-        return box_pred, pred_classes, pred_scores
+        box_area = (box[..., 3] - box[..., 1]) * (box[..., 2] - box[..., 0])
+        boxes_area = ((boxes[..., 3] - boxes[..., 1]) *
+                      (boxes[..., 2] - boxes[..., 0]))
+        union_area = box_area + boxes_area - inter_area
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return inter_area / union_area
+
+    def nms_keep(self, boxes, block=2048):
+        """
+        Greedy non-max suppression over boxes sorted by descending score
+        Arguments:
+        boxes: a numpy.ndarray of shape (n, 4) containing the boxes of a
+            single class (or class-offset boxes), sorted by score
+        block: the largest n for which the full (n, n) IoU matrix is
+            built; bigger inputs compute one IoU row per kept box instead
+        Returns:
+            a boolean numpy.ndarray of shape (n,) that is True for every
+                box that survives suppression
+        """
+        n = boxes.shape[0]
+        keep = np.ones(n, dtype=bool)
+
+        if n <= block:
+            suppress = self.iou(boxes[:, np.newaxis], boxes) > self.nms_t
+            for i in range(n):
+                if keep[i]:
+                    keep[i + 1:] &= ~suppress[i, i + 1:]
+        else:
+            for i in range(n):
+                if keep[i]:
+                    rest = i + 1 + np.flatnonzero(keep[i + 1:])
+                    keep[rest] = ~(self.iou(boxes[i], boxes[rest]) >
+                                   self.nms_t)
+
+        return keep
 
     @staticmethod
     def load_images(folder_path):
@@ -254,7 +520,69 @@ class Yolo():
 
         return images, image_paths
 
-    def preprocess_images(self, images):
+    @staticmethod
+    def resize_image(image, dim):
+        """
+        Resizes an image with inter-cubic interpolation
+        Returns:
+            Tuple of (image_resized, image_shape):
+            image_resized: the image resized to dim
+            image_shape: the original (image_height, image_width)
+        """
+        return (cv2.resize(image, dim, interpolation=cv2.INTER_CUBIC),
+                image.shape[:2])
+
+    @staticmethod
+    def read_resize_image(image_path, dim):
+        """
+        Reads an image from image_path and resizes it, see resize_image
+        """
+        return Yolo.resize_image(cv2.imread(image_path), dim)
+
+    @staticmethod
+    def stack_images(resized, out=None):
+        """
+        Stacks a list of (image_resized, image_shape) into the tuple of
+            (pimages, image_shapes) returned by preprocess_images
+        out: if given, a numpy.ndarray of shape (ni, input_h, input_w, 3)
+            that the uint8 images are normalised into, in its own dtype
+        """
+        if out is None:
+            pimages = np.array([image for image, _ in resized]) / 255
+        else:
+            pimages = out
+            for i, (image, _) in enumerate(resized):
+                np.divide(image, 255, out=pimages[i], dtype=pimages.dtype)
+        image_shapes = np.array([shape for _, shape in resized])
+        return pimages, image_shapes
+
+    def input_buffer(self, ni, dtype):
+        """
+        Returns a view of ni images on the preallocated input batch,
+            which is only reallocated when it is too small or its dtype
+            changes; its content is overwritten by the next call
+        """
+        width = self.input_w
+        height = self.input_h
+        if (self.buffer is None or self.buffer.dtype != dtype or
+                self.buffer.shape[0] < ni):
+            self.buffer = np.empty((ni, height, width, 3), dtype=dtype)
+        return self.buffer[:ni]
+
+    @staticmethod
+    def make_executor(workers=None, executor='thread'):
+        """
+        Creates the pool used for the decode and resize stage
+        Arguments:
+        workers: the number of workers, None for the executor default
+        executor: 'thread' (OpenCV releases the GIL) or 'process'
+        """
+        if executor == 'process':
+            return ProcessPoolExecutor(workers)
+        return ThreadPoolExecutor(workers)
+
+    def preprocess_images(self, images, workers=0, executor='thread',
+                          dtype=None):
         """
         Process images.
         Requisites:
@@ -262,6 +590,12 @@ class Yolo():
         Rescale all images to have pixel values in the range [0, 1]
         Arguments:
         images: a list of images as numpy.ndarrays
+        workers: if not 0, the images are resized in parallel by a pool
+            of this many workers (None for the executor default)
+        executor: the kind of pool, 'thread' or 'process'
+        dtype: if given (e.g. numpy.float32), the images are normalised
+            into the preallocated buffer of this dtype, which is reused
+            by later calls, instead of a new float64 array
         Returns a tuple of (pimages, image_shapes):
             pimages: a numpy.ndarray of shape (ni, input_h, input_w, 3)
                     containing all of the preprocessed images
@@ -275,23 +609,136 @@ class Yolo():
                     the original height and width of the images
                 2 => (image_height, image_width)
         """
-        width = self.model.input.shape[1].value
-        height = self.model.input.shape[2].value
+        width = self.input_w
+        height = self.input_h
         dim = (width, height)
-        pimages = []
-        image_shapes = []
-
-        for img in images:
-            img_shape = img.shape[0], img.shape[1]
-            image_shapes.append(img_shape)
-            img_resized = cv2.resize(
-                img, dim, interpolation=cv2.INTER_CUBIC)
-            pimage = img_resized / 255
-            pimages.append(pimage)
-        pimages = np.array(pimages)
-        image_shapes = np.array(image_shapes)
 
-        return pimages, image_shapes
+        if workers == 0:
+            resized = [self.resize_image(img, dim) for img in images]
+        else:
+            with self.make_executor(workers, executor) as pool:
+                resized = list(pool.map(self.resize_image, images,
+                                        repeat(dim)))
+
+        out = None if dtype is None else self.input_buffer(len(images), dtype)
+        return self.stack_images(resized, out)
+
+    def draw_boxes(self, image, boxes, box_classes, box_scores):
+        """
+        Draws the boundary boxes, class names and box scores on image,
+            in place, as described in show_boxes
+        """
+        box_scores_round = np.around(box_scores, decimals=2)
+        for i, box in enumerate(boxes):
+            score = str(box_scores_round[i])
+            start = (int(box[0]), int(box[3]))
+            end = (int(box[2]), int(box[1]))
+
+            cv2.rectangle(image, start, end, (255, 0, 0), 2)
+            title = self.class_names[box_classes[i]] + ' ' + score
+            cv2.putText(image, title,
+                        (int(box[0]) + 1, int(box[1]) - 5),
+                        cv2.FONT_HERSHEY_SIMPLEX,
+                        0.5, (0, 0, 255), 1, cv2.LINE_AA)
+
+    def save_boxes(self, image_path, boxes, box_classes, box_scores,
+                   folder='detections', image=None):
+        """
+        Draws the boxes on an image and writes it to folder without
+            displaying it, so it can run on a headless background worker
+        Arguments:
+        image_path: the file path where the original image is stored
+        boxes, box_classes, box_scores: the predictions for the image
+        folder: the directory the image is saved in, created if needed
+        image: the unprocessed image, read from image_path if None
+        """
+        if image is None:
+            image = cv2.imread(image_path)
+        self.draw_boxes(image, boxes, box_classes, box_scores)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, os.path.basename(image_path))
+        if not cv2.imwrite(path, image):
+            raise OSError('could not write {}'.format(path))
+
+    @staticmethod
+    def track_writes(stack):
+        """
+        Collects the futures of background writes, so that their errors
+            are not lost
+        Arguments:
+        stack: the contextlib.ExitStack of the writes; when it closes
+            without an exception, it waits for the pending writes and
+            raises the first error among them
+        Returns:
+            a function f(future) that adds a future and raises the error
+                of the writes done so far
+        """
+        futures = deque()
+
+        def finish(exc_type, exc, tb):
+            """Raises the first error of the pending writes"""
+            if exc_type is None:
+                while futures:
+                    futures.popleft().result()
+
+        stack.push(finish)
+
+        def track(future):
+            """Adds future and raises the errors of the done writes"""
+            futures.append(future)
+            while futures and futures[0].done():
+                futures.popleft().result()
+
+        return track
+
+    @staticmethod
+    def detections_record(image_path, boxes, box_classes, box_scores,
+                          frame=None):
+        """
+        Returns the predictions for an image, or for the given frame
+            of a video, as a line of NDJSON
+        """
+        record = {'image_path': image_path}
+        if frame is not None:
+            record['frame'] = frame
+        record.update({'boxes': np.asarray(boxes).tolist(),
+                       'classes': np.asarray(box_classes).tolist(),
+                       'scores': np.asarray(box_scores).tolist()})
+        return json.dumps(record) + '\n'
+
+    def detection_outputs(self, stack, folder=None, sink_path=None,
+                          writers=None):
+        """
+        Opens the headless outputs of a batch prediction on stack
+        Arguments:
+        stack: the contextlib.ExitStack that closes the outputs
+        folder: if given, annotated images are written to this
+            directory by a background pool of writer threads
+        sink_path: if given, the path of an NDJSON file receiving one
+            line of predictions per image
+        writers: the number of writer threads, None for the default
+        Returns:
+            a function f(image_path, boxes, box_classes, box_scores,
+                image=None) that outputs the predictions of one image
+        """
+        pool = None
+        sink = None
+        if folder is not None:
+            pool = stack.enter_context(ThreadPoolExecutor(writers))
+            track = self.track_writes(stack)
+        if sink_path is not None:
+            sink = stack.enter_context(open(sink_path, 'w'))
+
+        def write(image_path, boxes, box_classes, box_scores, image=None):
+            """Writes the predictions of one image"""
+            if pool is not None:
+                track(pool.submit(self.save_boxes, image_path, boxes,
+                                  box_classes, box_scores, folder, image))
+            if sink is not None:
+                sink.write(self.detections_record(
+                    image_path, boxes, box_classes, box_scores))
+
+        return write
 
     def show_boxes(self, image, boxes, box_classes, box_scores, file_name):
         """
@@ -326,18 +773,7 @@ class Yolo():
             If any key besides s is pressed, the image window
                 should be closed without saving
         """
-        box_scores_round = np.around(box_scores, decimals=2)
-        for i, box in enumerate(boxes):
-            score = str(box_scores_round[i])
-            start = (int(box[0]), int(box[3]))
-            end = (int(box[2]), int(box[1]))
-
-            cv2.rectangle(image, start, end, (255, 0, 0), 2)
-            title = self.class_names[box_classes[i]] + ' ' + score
-            cv2.putText(image, title,
-                        (int(box[0]) + 1, int(box[1]) - 5),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.5, (0, 0, 255), 1, cv2.LINE_AA)
+        self.draw_boxes(image, boxes, box_classes, box_scores)
         cv2.imshow(file_name, image)
 
         key = cv2.waitKey(0)
@@ -347,12 +783,35 @@ class Yolo():
             cv2.imwrite('./detections/' + file_name, image)
         cv2.destroyAllWindows()
 
-    def predict(self, folder_path):
+    def postprocess_batch(self, outputs, image_sizes):
+        """
+        Decodes, filters and suppresses the Darknet outputs for a batch
+        Arguments:
+        outputs: the list of outputs from model.predict for ni images
+        image_sizes: numpy.ndarray of shape (ni, 2) containing the
+            images' original sizes [image_height, image_width]
+        Returns:
+            a list of ni tuples of (boxes, box_classes, box_scores)
+        """
+        filtered = self.filter_boxes_batch(
+            *self.process_outputs_batch(outputs, image_sizes))
+        return [self.non_max_suppression(*image) for image in filtered]
+
+    def predict(self, folder_path, headless=False, folder='detections',
+                sink_path=None, writers=None):
         """
         Displays all images using the show_boxes method
         Arguments:
         folder_path: a string representing the path to the folder
             holding all the images to predict
+        headless: if True, the images are not displayed; instead the
+            annotated images are written to folder by background writer
+            threads, see detection_outputs
+        folder: the directory of the annotated images in headless mode,
+            None to not write them
+        sink_path: in headless mode, an optional NDJSON file of the
+            predictions
+        writers: the number of writer threads in headless mode
         Returns:
         Tuple of (predictions, image_paths):
             predictions: a list of tuples for each
@@ -364,18 +823,207 @@ class Yolo():
         images, image_paths = self.load_images(folder_path)
         pimages, image_shapes = self.preprocess_images(images)
         output = self.model.predict(pimages)
+        results = self.postprocess_batch(output, image_shapes)
 
-        for i, img in enumerate(images):
-            outputs = [output[0][i, :, :, :, :],
-                    output[1][i, :, :, :, :],
-                    output[2][i, :, :, :, :]]
-            dim = np.array([img.shape[0], img.shape[1]])
-            bx, conf, prob = self.process_outputs(outputs, dim)
-            boxes, classes, scores = self.filter_boxes(bx, conf, prob)
-            boxes, classes, scores = self.non_max_suppression(
-                boxes, classes, scores)
-            name = image_paths[i].split('/')[-1]
-            self.show_boxes(img, boxes, classes, scores, name)
-            predictions.append((boxes, classes, scores))
+        with ExitStack() as stack:
+            if headless:
+                write = self.detection_outputs(stack, folder, sink_path,
+                                               writers)
+            for i, img in enumerate(images):
+                boxes, classes, scores = results[i]
+                if headless:
+                    write(image_paths[i], boxes, classes, scores, img)
+                else:
+                    name = image_paths[i].split('/')[-1]
+                    self.show_boxes(img, boxes, classes, scores, name)
+                predictions.append((boxes, classes, scores))
 
         return (predictions, image_paths)
+
+    def predict_stream(self, folder_path, batch_size=32, workers=None,
+                       executor='thread', prefetch=1, dtype=np.float32,
+                       folder=None, sink_path=None, writers=None):
+        """
+        Runs the detection over a folder in chunks of batch_size images,
+        so memory depends on batch_size and not on the folder size.
+        Images are read and resized by a pool of workers, up to prefetch
+        chunks ahead, so the decoding of the next chunks overlaps
+        model.predict on the current one.
+        Arguments:
+        folder_path: a string representing the path to the folder
+            holding all the images to predict
+        batch_size: the number of images predicted at a time
+        workers: the number of decode/resize workers, None for the
+            executor default
+        executor: the kind of pool, 'thread' or 'process'
+        prefetch: the number of chunks decoded ahead of the current one
+        dtype: the dtype of the reused input batch, None for a new
+            float64 array per chunk
+        folder, sink_path, writers: the optional headless outputs, see
+            detection_outputs
+        Yields:
+            a tuple of (image_path, boxes, box_classes, box_scores) for
+                each image, as soon as its chunk has been processed
+        """
+        image_paths = glob.glob(folder_path + '/*')
+        width = self.input_w
+        height = self.input_h
+        dim = (width, height)
+
+        with ExitStack() as stack:
+            pool = stack.enter_context(self.make_executor(workers, executor))
+            write = self.detection_outputs(stack, folder, sink_path,
+                                           writers)
+            jobs = ((image_paths[start:start + batch_size],
+                     [pool.submit(self.read_resize_image, path, dim)
+                      for path in image_paths[start:start + batch_size]])
+                    for start in range(0, len(image_paths), batch_size))
+            queue = deque(islice(jobs, prefetch + 1))
+
+            while queue:
+                paths, futures = queue.popleft()
+                resized = [future.result() for future in futures]
+                queue.extend(islice(jobs, 1))
+                out = None
+                if dtype is not None:
+                    out = self.input_buffer(len(paths), dtype)
+                pimages, image_shapes = self.stack_images(resized, out)
+                del resized
+                output = self.model.predict(pimages)
+                results = self.postprocess_batch(output, image_shapes)
+
+                for path, result in zip(paths, results):
+                    write(path, *result)
+                    yield (path,) + tuple(result)
+
+    def detect_video(self, path_or_capture, batch_size=8, dtype=np.float32,
+                     output_path=None, sink_path=None, stats=None):
+        """
+        Runs the detection over the frames of a video or camera stream,
+        batch_size consecutive frames at a time, reusing the input
+        buffer and the cached grid offsets across batches
+        Arguments:
+        path_or_capture: a video file path, a camera index, or an opened
+            cv2.VideoCapture
+        batch_size: the number of frames predicted at a time
+        dtype: the dtype of the reused input batch, None for a new
+            float64 array per batch
+        output_path: if given, the annotated frames are written to this
+            video file by a background writer thread
+        sink_path: if given, the path of an NDJSON file receiving one
+            line of predictions per frame
+        stats: if given, a dict updated with the number of 'frames', the
+            'seconds' spent in each stage (read, preprocess, predict,
+            postprocess, output) and the 'fps' of the whole run
+        Yields:
+            a tuple of (frame_index, boxes, box_classes, box_scores) for
+                each frame, as soon as its batch has been processed
+        """
+        if stats is None:
+            stats = {}
+        stats.setdefault('frames', 0)
+        seconds = stats.setdefault('seconds', {})
+        for stage in ('read', 'preprocess', 'predict', 'postprocess',
+                      'output'):
+            seconds.setdefault(stage, 0.0)
+        width = self.input_w
+        height = self.input_h
+        dim = (width, height)
+        source = str(path_or_capture)
+
+        def tick(stage, since):
+            """Adds the time elapsed since since to stage"""
+            now = time.perf_counter()
+            seconds[stage] += now - since
+            return now
+
+        with ExitStack() as stack:
+            if isinstance(path_or_capture, cv2.VideoCapture):
+                capture = path_or_capture
+            else:
+                capture = cv2.VideoCapture(path_or_capture)
+                stack.callback(capture.release)
+            if not capture.isOpened():
+                raise OSError('could not open video {}'.format(source))
+            writer = None
+            pool = None
+            if output_path is not None:
+                pool = stack.enter_context(ThreadPoolExecutor(1))
+                track = self.track_writes(stack)
+            sink = None
+            if sink_path is not None:
+                sink = stack.enter_context(open(sink_path, 'w'))
+
+            start = time.perf_counter()
+            index = 0
+            done = False
+            while not done:
+                now = time.perf_counter()
+                frames = []
+                while len(frames) < batch_size:
+                    ok, frame = capture.read()
+                    if not ok:
+                        done = True
+                        break
+                    frames.append(frame)
+                now = tick('read', now)
+                if not frames:
+                    break
+
+                resized = [self.resize_image(frame, dim) for frame in frames]
+                out = None
+                if dtype is not None:
+                    out = self.input_buffer(len(frames), dtype)
+                pimages, image_shapes = self.stack_images(resized, out)
+                now = tick('preprocess', now)
+                output = self.model.predict(pimages)
+                now = tick('predict', now)
+                results = self.postprocess_batch(output, image_shapes)
+                now = tick('postprocess', now)
+
+                if pool is not None and writer is None:
+                    fps = capture.get(cv2.CAP_PROP_FPS) or 30
+                    shape = frames[0].shape
+                    writer = cv2.VideoWriter(
+                        output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps,
+                        (shape[1], shape[0]))
+                    if not writer.isOpened():
+                        raise OSError('could not open {} for writing'
+                                      .format(output_path))
+                    # callbacks run last in first out: the pending frames
+                    # are written before the writer is released
+                    stack.callback(writer.release)
+                    stack.callback(pool.shutdown)
+                for frame, result in zip(frames, results):
+                    if pool is not None:
+                        track(pool.submit(self.write_frame, writer, frame,
+                                          *result))
+                    if sink is not None:
+                        sink.write(self.detections_record(
+                            source, *result, frame=index))
+                    index += 1
+                tick('output', now)
+
+                stats['frames'] = index
+                stats['fps'] = index / (time.perf_counter() - start)
+                for i, result in enumerate(results):
+                    yield (index - len(results) + i,) + tuple(result)
+
+    def write_frame(self, writer, frame, boxes, box_classes, box_scores):
+        """
+        Draws the boxes on a video frame and appends it to writer
+        """
+        self.draw_boxes(frame, boxes, box_classes, box_scores)
+        writer.write(frame)
+
+    @staticmethod
+    def format_stats(stats):
+        """
+        Formats the stats of detect_video as frames per second and
+            milliseconds per frame of each stage
+        """
+        frames = max(stats['frames'], 1)
+        stages = ', '.join('{} {:.1f} ms'.format(stage, 1000 * t / frames)
+                           for stage, t in stats['seconds'].items())
+        return '{} frames, {:.1f} fps ({})'.format(
+            stats['frames'], stats.get('fps', 0.0), stages)